@@ -1,12 +1,20 @@
 from datetime import timedelta
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from ....core.config import settings
-from ....core.security import create_access_token, verify_password, get_password_hash, encrypt_api_key
+from ....core.security import (
+    DUMMY_PASSWORD_HASH,
+    create_access_token,
+    verify_password,
+    get_password_hash,
+    encrypt_api_key,
+)
 from ....models.user import User
 from ....schemas.user import User as UserSchema, UserCreate, Token, FirstTimeSetup
 from ....services.log_service import LogService
@@ -18,13 +26,14 @@ router = APIRouter()
 
 @router.post("/register", response_model=UserSchema)
 def register_user(
-    user_in: UserCreate, db: Session = Depends(get_db)
+    user_in: UserCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)
 ) -> Any:
     """
     Register a new user.
     
     Args:
         user_in: User data for registration
+        background_tasks: Background tasks run after the response is sent
         db: Database session
         
     Returns:
@@ -33,24 +42,8 @@ def register_user(
     Raises:
         HTTPException: If username or email is already registered
     """
-    user = db.query(User).filter(User.username == user_in.username).first()
-    if user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered",
-        )
-    
-    user = db.query(User).filter(User.email == user_in.email).first()
-    if user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered",
-        )
-    
-    # Check if there are any users in the system
-    first_user = db.query(User).first() is None
-    
-    # Create the user
+    # Create the user, relying on the UNIQUE constraints on username and email
+    # instead of checking availability beforehand
     encrypted_api_key = encrypt_api_key(user_in.cloudflare_api_key)
     db_user = User(
         username=user_in.username,
@@ -61,12 +54,15 @@ def register_user(
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise_registration_conflict(db, user_in)
     
     # Log the registration
-    LogService.create_log(
-        db=db,
+    background_tasks.add_task(
+        LogService.write_log,
         level=LogLevel.INFO,
         message=f"User {db_user.username} registered successfully",
         user_id=db_user.id
@@ -75,14 +71,44 @@ def register_user(
     return db_user
 
 
+def raise_registration_conflict(db: Session, user_in: UserCreate) -> None:
+    """
+    Raises the error matching the unique constraint a registration violated.
+    
+    Args:
+        db: Database session
+        user_in: User data for registration
+        
+    Raises:
+        HTTPException: Always, naming whether the username or email is taken
+    """
+    existing_users = db.query(User.username, User.email).filter(
+        or_(User.username == user_in.username, User.email == user_in.email)
+    ).all()
+    
+    if any(username == user_in.username for username, _ in existing_users):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already registered",
+        )
+    
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Email already registered",
+    )
+
+
 @router.post("/login", response_model=Token)
 def login(
-    db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login.
     
     Args:
+        background_tasks: Background tasks run after the response is sent
         db: Database session
         form_data: OAuth2 form with username and password
         
@@ -93,7 +119,12 @@ def login(
         HTTPException: If login fails
     """
     user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    
+    # Always verify a hash so unknown usernames can't be detected through timing
+    password_valid = verify_password(
+        form_data.password, user.hashed_password if user else DUMMY_PASSWORD_HASH
+    )
+    if not user or not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -101,8 +132,8 @@ def login(
         )
     
     # Log the login
-    LogService.create_log(
-        db=db,
+    background_tasks.add_task(
+        LogService.write_log,
         level=LogLevel.INFO,
         message=f"User {user.username} logged in",
         user_id=user.id
@@ -142,11 +173,13 @@ def get_setup_status(db: Session = Depends(get_db)) -> dict:
     Returns:
         Dictionary with setup status information
     """
-    existing_user = db.query(User).first()
-    needs_setup = settings.FIRST_TIME_SETUP and existing_user is None
+    # The flag is synced with the database at startup and cleared once a user
+    # exists, so the query only runs while setup is still pending
+    if settings.FIRST_TIME_SETUP and users_exist(db):
+        settings.FIRST_TIME_SETUP = False
     
     return {
-        "needs_setup": needs_setup
+        "needs_setup": settings.FIRST_TIME_SETUP
     }
 
 
@@ -177,6 +210,19 @@ def first_time_setup(
     return generate_access_token(admin_user.username)
 
 
+def users_exist(db: Session) -> bool:
+    """
+    Checks whether at least one user exists, without loading any row.
+    
+    Args:
+        db: Database session
+        
+    Returns:
+        True if there are users in the system, False otherwise
+    """
+    return db.query(db.query(User.id).exists()).scalar()
+
+
 def validate_setup_is_allowed(db: Session) -> None:
     """
     Validates that first-time setup is allowed to proceed.
@@ -193,8 +239,8 @@ def validate_setup_is_allowed(db: Session) -> None:
             detail="First-time setup is not allowed. System is already configured."
         )
     
-    existing_user = db.query(User).first()
-    if existing_user:
+    if users_exist(db):
+        settings.FIRST_TIME_SETUP = False
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Setup is not allowed. Users already exist in the system."
@@ -224,7 +270,6 @@ def create_admin_user(db: Session, setup_data: FirstTimeSetup) -> User:
     
     db.add(admin_user)
     db.commit()
-    db.refresh(admin_user)
     
     return admin_user
 
@@ -1,15 +1,19 @@
-from typing import Any, List
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, raiseload
+from sqlalchemy import func, lambda_stmt, select
 
+from ....core.config import settings
 from ....core.security import decrypt_api_key
 from ....models.dns_record import DNSRecord
 from ....models.user import User
 from ....models.log import LogLevel
 from ....schemas.dns_record import DNSRecord as DNSRecordSchema, DNSRecordCreate, DNSRecordUpdate
-from ....services.cloudflare import CloudflareService
+from ....services.cloudflare import get_user_cf_service
 from ....services.log_service import LogService
 from ....services.ip_service import IPService
 from ...deps import get_db, get_current_active_user
@@ -17,8 +21,51 @@ from ...deps import get_db, get_current_active_user
 router = APIRouter()
 
 
+def get_user_dns_record(db: Session, record_id: int, user_id: int) -> Optional[DNSRecord]:
+    """
+    Get a DNS record owned by a user.
+    
+    The statement is built with lambda_stmt so its compiled SQL is cached and
+    reused across requests, only the bound IDs change.
+    
+    Args:
+        db: Database session
+        record_id: DNS record ID
+        user_id: Owner user ID
+        
+    Returns:
+        The DNS record or None if not found
+    """
+    stmt = lambda_stmt(
+        lambda: select(DNSRecord).where(DNSRecord.id == record_id, DNSRecord.user_id == user_id)
+    )
+    return db.execute(stmt).scalar_one_or_none()
+
+
+def _is_verification_due(db_record: DNSRecord) -> bool:
+    """
+    Check whether an unchanged IP verification should be written to the database.
+    
+    Args:
+        db_record: DNS record being verified
+        
+    Returns:
+        True if the record was last updated more than IP_VERIFY_WRITE_INTERVAL_MINUTES ago
+    """
+    updated_at = db_record.updated_at
+    if updated_at is None:
+        return True
+    
+    # SQLite returns naive UTC timestamps
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    
+    interval = timedelta(minutes=settings.IP_VERIFY_WRITE_INTERVAL_MINUTES)
+    return datetime.now(timezone.utc) - updated_at >= interval
+
+
 @router.get("/", response_model=List[DNSRecordSchema])
-async def read_dns_records(
+def read_dns_records(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
@@ -36,15 +83,19 @@ async def read_dns_records(
     Returns:
         List of DNS records
     """
-    records = db.query(DNSRecord).filter(
+    # The response schema only reads columns, so relationships must never be
+    # lazy-loaded per row while serializing
+    stmt = select(DNSRecord).options(raiseload("*")).where(
         DNSRecord.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    ).order_by(DNSRecord.id).offset(skip).limit(limit)
+    records = db.execute(stmt).scalars().all()
     
     return records
 
 
 @router.get("/zones")
 async def get_cloudflare_zones(
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
@@ -52,6 +103,7 @@ async def get_cloudflare_zones(
     Retrieve Cloudflare zones (domains) for the current user.
     
     Args:
+        background_tasks: Background tasks run after the response is sent
         db: Database session
         current_user: Current authenticated user
         
@@ -59,17 +111,14 @@ async def get_cloudflare_zones(
         List of Cloudflare zones
     """
     # Initialize Cloudflare service
-    cf_service = CloudflareService(
-        api_key=current_user.cloudflare_api_key,
-        email=current_user.cloudflare_email
-    )
+    cf_service = get_user_cf_service(current_user)
     
     # Get zones from Cloudflare
     zones = await cf_service.get_zones()
     
     if not zones:
-        LogService.create_log(
-            db=db,
+        background_tasks.add_task(
+            LogService.write_log,
             level=LogLevel.WARNING,
             message="No Cloudflare zones found",
             user_id=current_user.id
@@ -146,17 +195,14 @@ async def create_dns_record(
         HTTPException: If Cloudflare API request fails
     """
     # Initialize Cloudflare service
-    cf_service = CloudflareService(
-        api_key=current_user.cloudflare_api_key,
-        email=current_user.cloudflare_email
-    )
+    cf_service = get_user_cf_service(current_user)
+    
+    # Get current IP once if auto_update is True, and use it for A/AAAA records
+    current_ip = await IPService.get_current_ip() if record_in.auto_update else None
     
-    # Get current IP if it's an A/AAAA record and auto_update is True
     content = record_in.content
-    if record_in.auto_update and record_in.record_type in ("A", "AAAA"):
-        current_ip = await IPService.get_current_ip()
-        if current_ip:
-            content = current_ip
+    if current_ip and record_in.record_type in ("A", "AAAA"):
+        content = current_ip
     
     # Create record in Cloudflare
     cf_record = await cf_service.create_dns_record(
@@ -185,8 +231,6 @@ async def create_dns_record(
         )
     
     # Create record in database
-    current_ip = await IPService.get_current_ip() if record_in.auto_update else None
-    
     db_record = DNSRecord(
         user_id=current_user.id,
         zone_id=record_in.zone_id,
@@ -202,24 +246,25 @@ async def create_dns_record(
     )
     
     db.add(db_record)
-    db.commit()
-    db.refresh(db_record)
+    db.flush()
     
-    # Log success
+    # Log success in the same transaction
     LogService.create_log(
         db=db,
         level=LogLevel.SUCCESS,
         message=f"DNS record created: {record_in.record_name}",
         user_id=current_user.id,
         dns_record_id=db_record.id,
-        ip_address=content if record_in.record_type in ("A", "AAAA") else None
+        ip_address=content if record_in.record_type in ("A", "AAAA") else None,
+        commit=False
     )
+    db.commit()
     
     return db_record
 
 
 @router.get("/{record_id}", response_model=DNSRecordSchema)
-async def read_dns_record(
+def read_dns_record(
     record_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
@@ -238,9 +283,7 @@ async def read_dns_record(
     Raises:
         HTTPException: If record not found
     """
-    record = db.query(DNSRecord).filter(
-        DNSRecord.id == record_id, DNSRecord.user_id == current_user.id
-    ).first()
+    record = get_user_dns_record(db, record_id, current_user.id)
     
     if not record:
         raise HTTPException(
@@ -273,9 +316,7 @@ async def update_dns_record(
     Raises:
         HTTPException: If record not found or update fails
     """
-    db_record = db.query(DNSRecord).filter(
-        DNSRecord.id == record_id, DNSRecord.user_id == current_user.id
-    ).first()
+    db_record = get_user_dns_record(db, record_id, current_user.id)
     
     if not db_record:
         raise HTTPException(
@@ -284,10 +325,7 @@ async def update_dns_record(
         )
     
     # Initialize Cloudflare service
-    cf_service = CloudflareService(
-        api_key=current_user.cloudflare_api_key,
-        email=current_user.cloudflare_email
-    )
+    cf_service = get_user_cf_service(current_user)
     
     # Get updated values
     record_type = record_in.record_type or db_record.record_type
@@ -324,26 +362,25 @@ async def update_dns_record(
         )
     
     # Update record in database
-    update_data = record_in.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_record, key, value)
+    update_data = record_in.model_dump(exclude_unset=True)
     
     # If we're updating content and it's an IP record, update last_updated_ip
     if "content" in update_data and record_type in ("A", "AAAA"):
-        db_record.last_updated_ip = content
+        update_data["last_updated_ip"] = content
     
-    db.commit()
-    db.refresh(db_record)
+    db.query(DNSRecord).filter(DNSRecord.id == db_record.id).update(update_data)
     
-    # Log success
+    # Log success in the same transaction
     LogService.create_log(
         db=db,
         level=LogLevel.SUCCESS,
         message=f"DNS record updated: {db_record.record_name}",
         user_id=current_user.id,
         dns_record_id=db_record.id,
-        ip_address=content if record_type in ("A", "AAAA") else None
+        ip_address=content if record_type in ("A", "AAAA") else None,
+        commit=False
     )
+    db.commit()
     
     return db_record
 
@@ -365,9 +402,7 @@ async def delete_dns_record(
     Raises:
         HTTPException: If record not found or deletion fails
     """
-    db_record = db.query(DNSRecord).filter(
-        DNSRecord.id == record_id, DNSRecord.user_id == current_user.id
-    ).first()
+    db_record = get_user_dns_record(db, record_id, current_user.id)
     
     if not db_record:
         raise HTTPException(
@@ -376,10 +411,7 @@ async def delete_dns_record(
         )
     
     # Initialize Cloudflare service
-    cf_service = CloudflareService(
-        api_key=current_user.cloudflare_api_key,
-        email=current_user.cloudflare_email
-    )
+    cf_service = get_user_cf_service(current_user)
     
     # Delete record from Cloudflare
     success = await cf_service.delete_dns_record(
@@ -408,15 +440,16 @@ async def delete_dns_record(
     
     # Delete record from database
     db.delete(db_record)
-    db.commit()
     
-    # Log success
+    # Log success in the same transaction
     LogService.create_log(
         db=db,
         level=LogLevel.INFO,
         message=f"DNS record deleted: {record_name}",
-        user_id=current_user.id
+        user_id=current_user.id,
+        commit=False
     )
+    db.commit()
 
 
 @router.post("/{record_id}/update-ip", response_model=DNSRecordSchema)
@@ -439,9 +472,7 @@ async def update_dns_record_ip(
     Raises:
         HTTPException: If record not found or update fails
     """
-    db_record = db.query(DNSRecord).filter(
-        DNSRecord.id == record_id, DNSRecord.user_id == current_user.id
-    ).first()
+    db_record = get_user_dns_record(db, record_id, current_user.id)
     
     if not db_record:
         raise HTTPException(
@@ -456,8 +487,8 @@ async def update_dns_record_ip(
             detail="IP updating is only available for A or AAAA records"
         )
     
-    # Get current IP
-    current_ip = await IPService.get_current_ip()
+    # Get current IP, bypassing the cache for this explicit update
+    current_ip = await IPService.get_current_ip(force_refresh=True)
     if not current_ip:
         # Log error
         LogService.create_log(
@@ -475,33 +506,31 @@ async def update_dns_record_ip(
     
     # Check if IP has changed
     if not IPService.is_ip_changed(current_ip, db_record.last_updated_ip):
-        # Even if IP hasn't changed, log the verification and update timestamp
-        old_ip = db_record.content
-        
-        # Update timestamp even if IP hasn't changed
-        db_record.updated_at = func.now()
-        db_record.last_updated_ip = current_ip
+        # Nothing to push: only touch the record (and log the verification)
+        # once per write interval to avoid a write on every poll
+        if not _is_verification_due(db_record):
+            return db_record
         
-        db.commit()
-        db.refresh(db_record)
+        db.query(DNSRecord).filter(DNSRecord.id == db_record.id).update(
+            {"last_updated_ip": current_ip, "updated_at": func.now()}
+        )
         
-        # Log the verification attempt
+        # Log the verification attempt in the same transaction
         LogService.create_log(
             db=db,
             level=LogLevel.INFO,
             message=f"IP verification for {db_record.record_name} (unchanged: {current_ip})",
             user_id=current_user.id,
             dns_record_id=db_record.id,
-            ip_address=current_ip
+            ip_address=current_ip,
+            commit=False
         )
+        db.commit()
         
         return db_record
     
     # Initialize Cloudflare service
-    cf_service = CloudflareService(
-        api_key=current_user.cloudflare_api_key,
-        email=current_user.cloudflare_email
-    )
+    cf_service = get_user_cf_service(current_user)
     
     # Update record in Cloudflare
     cf_record = await cf_service.update_dns_record(
@@ -535,23 +564,22 @@ async def update_dns_record_ip(
     db_record.content = current_ip
     db_record.last_updated_ip = current_ip
     
-    db.commit()
-    db.refresh(db_record)
-    
-    # Log success
+    # Log success in the same transaction
     LogService.create_log(
         db=db,
         level=LogLevel.SUCCESS,
         message=f"IP updated for {db_record.record_name} ({old_ip} -> {current_ip})",
         user_id=current_user.id,
         dns_record_id=db_record.id,
-        ip_address=current_ip
+        ip_address=current_ip,
+        commit=False
     )
+    db.commit()
     
     return db_record
 
 
-@router.get("/records/{zone_id}", response_model=List[dict])
+@router.get("/records/{zone_id}", response_class=ORJSONResponse)
 async def get_cloudflare_dns_records(
     zone_id: str,
     current_user: User = Depends(get_current_active_user),
@@ -570,10 +598,7 @@ async def get_cloudflare_dns_records(
         HTTPException: If Cloudflare API request fails
     """
     # Initialize Cloudflare service
-    cf_service = CloudflareService(
-        api_key=current_user.cloudflare_api_key,
-        email=current_user.cloudflare_email
-    )
+    cf_service = get_user_cf_service(current_user)
     
     # Get DNS records from Cloudflare
     records = await cf_service.get_dns_records(zone_id=zone_id)
@@ -584,11 +609,13 @@ async def get_cloudflare_dns_records(
             detail="Failed to get DNS records from Cloudflare"
         )
     
-    return records
+    # Raw Cloudflare dicts need no validation, serialize them directly
+    return ORJSONResponse(records)
 
 
 @router.post("/update-all-ips", response_model=dict)
 async def update_all_dns_record_ips(
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
@@ -596,6 +623,7 @@ async def update_all_dns_record_ips(
     Update IP for all A and AAAA DNS records.
     
     Args:
+        background_tasks: Background tasks run after the response is sent
         db: Database session
         current_user: Current authenticated user
         
@@ -613,16 +641,16 @@ async def update_all_dns_record_ips(
     
     if not records:
         # Log even if no records found
-        LogService.create_log(
-            db=db,
+        background_tasks.add_task(
+            LogService.write_log,
             level=LogLevel.INFO,
             message="Update all IPs attempted but no A/AAAA records found",
             user_id=current_user.id
         )
         return {"updated": 0, "message": "No DNS records found to update"}
     
-    # Get current IP
-    current_ip = await IPService.get_current_ip()
+    # Get current IP, bypassing the cache for this explicit update
+    current_ip = await IPService.get_current_ip(force_refresh=True)
     if not current_ip:
         LogService.create_log(
             db=db,
@@ -637,21 +665,13 @@ async def update_all_dns_record_ips(
         )
     
     # Initialize Cloudflare service
-    cf_service = CloudflareService(
-        api_key=current_user.cloudflare_api_key,
-        email=current_user.cloudflare_email
-    )
+    cf_service = get_user_cf_service(current_user)
     
-    updated_count = 0
-    checked_count = 0
+    semaphore = asyncio.Semaphore(settings.CLOUDFLARE_MAX_CONCURRENCY)
     
-    for record in records:
-        checked_count += 1
-        ip_changed = IPService.is_ip_changed(current_ip, record.content)
-        
-        try:
-            # Always update the record in Cloudflare, regardless of whether IP has changed
-            cf_record = await cf_service.update_dns_record(
+    async def push_current_ip(record: DNSRecord) -> Optional[dict]:
+        async with semaphore:
+            return await cf_service.update_dns_record(
                 zone_id=record.zone_id,
                 record_id=record.record_id,
                 type=record.record_type,
@@ -660,70 +680,100 @@ async def update_all_dns_record_ips(
                 ttl=record.ttl,
                 proxied=record.proxied
             )
-            
-            if not cf_record:
-                # Log error but continue with other records
-                LogService.create_log(
-                    db=db,
-                    level=LogLevel.ERROR,
-                    message=f"Failed to update IP for DNS record: {record.record_name}",
-                    user_id=current_user.id,
-                    dns_record_id=record.id,
-                    ip_address=current_ip
-                )
-                continue
-                
-            # Update record in database
-            old_ip = record.content
-            if ip_changed:
-                record.content = current_ip
-                updated_count += 1
-            
-            # Always update the timestamp and last_updated_ip, even if IP didn't change
-            record.last_updated_ip = current_ip
-            record.updated_at = func.now()
-            
-            # Log success based on whether IP changed
-            if ip_changed:
-                LogService.create_log(
-                    db=db,
-                    level=LogLevel.SUCCESS,
-                    message=f"IP updated for {record.record_name} ({old_ip} -> {current_ip})",
-                    user_id=current_user.id,
-                    dns_record_id=record.id,
-                    ip_address=current_ip
-                )
-            else:
-                LogService.create_log(
-                    db=db,
-                    level=LogLevel.INFO,
-                    message=f"IP verification for {record.record_name} (unchanged: {current_ip})",
-                    user_id=current_user.id,
-                    dns_record_id=record.id,
-                    ip_address=current_ip
-                )
-                
-        except Exception as e:
+    
+    # Only records whose IP has changed need to be updated in Cloudflare, and
+    # unchanged records are only written when their verification is due
+    changed_records = []
+    unchanged_records = []
+    for record in records:
+        if IPService.is_ip_changed(current_ip, record.content):
+            changed_records.append(record)
+        elif _is_verification_due(record):
+            unchanged_records.append(record)
+    
+    # Calls are dispatched concurrently, then results are applied to the database below
+    results = await asyncio.gather(
+        *(push_current_ip(record) for record in changed_records),
+        return_exceptions=True
+    )
+    
+    checked_count = len(records)
+    updated_ids = []
+    log_entries = []
+    
+    for record, cf_record in zip(changed_records, results):
+        if isinstance(cf_record, Exception):
             # Log error but continue with other records
-            LogService.create_log(
-                db=db,
-                level=LogLevel.ERROR,
-                message=f"Error updating {record.record_name}: {str(e)}",
-                user_id=current_user.id,
-                dns_record_id=record.id
-            )
+            log_entries.append({
+                "level": LogLevel.ERROR,
+                "message": f"Error updating {record.record_name}: {str(cf_record)}",
+                "user_id": current_user.id,
+                "dns_record_id": record.id,
+            })
+            continue
+        
+        if not cf_record:
+            # Log error but continue with other records
+            log_entries.append({
+                "level": LogLevel.ERROR,
+                "message": f"Failed to update IP for DNS record: {record.record_name}",
+                "user_id": current_user.id,
+                "dns_record_id": record.id,
+                "ip_address": current_ip,
+            })
+            continue
+        
+        updated_ids.append(record.id)
+        log_entries.append({
+            "level": LogLevel.SUCCESS,
+            "message": f"IP updated for {record.record_name} ({record.content} -> {current_ip})",
+            "user_id": current_user.id,
+            "dns_record_id": record.id,
+            "ip_address": current_ip,
+        })
+    
+    updated_count = len(updated_ids)
+    if updated_ids:
+        # Update records in database with a single statement
+        db.query(DNSRecord).filter(DNSRecord.id.in_(updated_ids)).update(
+            {
+                DNSRecord.content: current_ip,
+                DNSRecord.last_updated_ip: current_ip,
+                DNSRecord.updated_at: func.now(),
+            },
+            synchronize_session=False
+        )
     
-    # Commit all changes at once
-    db.commit()
+    if unchanged_records:
+        # Update the timestamp and last_updated_ip of unchanged records in one statement
+        db.query(DNSRecord).filter(
+            DNSRecord.id.in_([record.id for record in unchanged_records])
+        ).update(
+            {DNSRecord.last_updated_ip: current_ip, DNSRecord.updated_at: func.now()},
+            synchronize_session=False
+        )
+        
+        log_entries.extend(
+            {
+                "level": LogLevel.INFO,
+                "message": f"IP verification for {record.record_name} (unchanged: {current_ip})",
+                "user_id": current_user.id,
+                "dns_record_id": record.id,
+                "ip_address": current_ip,
+            }
+            for record in unchanged_records
+        )
     
     # Log summary
-    LogService.create_log(
-        db=db,
-        level=LogLevel.INFO,
-        message=f"Bulk IP update completed: {updated_count} updated, {checked_count} checked",
-        user_id=current_user.id,
-        ip_address=current_ip
-    )
+    log_entries.append({
+        "level": LogLevel.INFO,
+        "message": f"Bulk IP update completed: {updated_count} updated, {checked_count} checked",
+        "user_id": current_user.id,
+        "ip_address": current_ip,
+    })
+    
+    # Commit all record changes and logs at once
+    LogService.create_logs(db=db, entries=log_entries)
     
     return {
         "checked": checked_count,
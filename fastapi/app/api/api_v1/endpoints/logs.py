@@ -1,6 +1,9 @@
-from typing import Any, List
+from typing import Any, Iterable, Iterator, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Row
 from sqlalchemy.orm import Session
 
 from ....models.log import Log
@@ -11,20 +14,41 @@ from ...deps import get_db, get_current_active_user
 
 router = APIRouter()
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def set_next_cursor(response: Response, logs: List[Log], limit: int) -> None:
+    """
+    Expose the cursor for the next page of logs in a response header.
+    
+    Args:
+        response: Response being built
+        logs: Logs returned for the current page
+        limit: Maximum number of logs requested
+    """
+    if logs and len(logs) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = str(logs[-1].id)
+
 
 @router.get("/", response_model=List[LogSchema])
-async def read_logs(
+def read_logs(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     """
     Retrieve logs for the current user.
     
+    Pass the X-Next-Cursor header of a page as cursor to get the next one.
+    
     Args:
-        skip: Number of logs to skip
+        response: Response, used to set the next page cursor
+        skip: Number of logs to skip (ignored when cursor is given)
         limit: Maximum number of logs to return
+        cursor: Only return logs older than this log ID
         db: Database session
         current_user: Current authenticated user
         
@@ -35,33 +59,104 @@ async def read_logs(
         db=db,
         skip=skip,
         limit=limit,
-        user_id=current_user.id
+        user_id=current_user.id,
+        before_id=cursor
     )
+    set_next_cursor(response, logs, limit)
     
     return logs
 
 
 @router.get("/system", response_model=List[LogSchema])
-async def read_system_logs(
+def read_system_logs(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     """
     Retrieve system logs (logs not associated with a specific user).
     
+    Pass the X-Next-Cursor header of a page as cursor to get the next one.
+    
     Args:
-        skip: Number of logs to skip
+        response: Response, used to set the next page cursor
+        skip: Number of logs to skip (ignored when cursor is given)
         limit: Maximum number of logs to return
+        cursor: Only return logs older than this log ID
         db: Database session
         current_user: Current authenticated user
         
     Returns:
         List of system logs
     """
-    logs = db.query(Log).filter(
-        Log.user_id.is_(None)
-    ).order_by(Log.created_at.desc()).offset(skip).limit(limit).all()
+    logs = LogService.get_system_logs(
+        db=db,
+        skip=skip,
+        limit=limit,
+        before_id=cursor
+    )
+    set_next_cursor(response, logs, limit)
     
-    return logs 
\ No newline at end of file
+    return logs 
+
+
+@router.get("/stream")
+def stream_logs(
+    cursor: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+) -> StreamingResponse:
+    """
+    Stream all logs of the current user as newline-delimited JSON, newest first.
+    
+    Args:
+        cursor: Only return logs older than this log ID
+        db: Database session
+        current_user: Current authenticated user
+        
+    Returns:
+        NDJSON stream of logs
+    """
+    rows = LogService.stream_logs(db=db, user_id=current_user.id, before_id=cursor)
+    return StreamingResponse(ndjson_lines(rows), media_type="application/x-ndjson")
+
+
+@router.get("/system/stream")
+def stream_system_logs(
+    cursor: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+) -> StreamingResponse:
+    """
+    Stream all system logs as newline-delimited JSON, newest first.
+    
+    Rows are fetched in batches and written as they are read, so memory
+    stays bounded however many logs there are.
+    
+    Args:
+        cursor: Only return logs older than this log ID
+        db: Database session
+        current_user: Current authenticated user
+        
+    Returns:
+        NDJSON stream of system logs
+    """
+    rows = LogService.stream_system_logs(db=db, before_id=cursor)
+    return StreamingResponse(ndjson_lines(rows), media_type="application/x-ndjson")
+
+
+def ndjson_lines(rows: Iterable[Row]) -> Iterator[bytes]:
+    """
+    Serialize result rows as newline-delimited JSON.
+    
+    Args:
+        rows: Result rows to serialize
+        
+    Yields:
+        One JSON line per row
+    """
+    for row in rows:
+        yield orjson.dumps(row._asdict()) + b"\n"
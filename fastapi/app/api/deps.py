@@ -1,18 +1,131 @@
+import hashlib
+import threading
+import time
 from typing import Generator, Optional
 
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from ..core.config import settings
 from ..core.database import get_db
+from ..core.security import JWT_ALGORITHMS, JWT_KEY
 from ..models.user import User
 from ..schemas.user import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
+CREDENTIALS_ERROR_DETAIL = "Could not validate credentials"
+CREDENTIALS_ERROR_HEADERS = {"WWW-Authenticate": "Bearer"}
+INACTIVE_USER_DETAIL = "Inactive user"
+
+
+def _credentials_exception() -> HTTPException:
+    """
+    Builds the error raised when a token can't be validated.
+    
+    A new exception is raised each time, as re-raising a shared instance would
+    keep accumulating tracebacks across requests.
+    
+    Returns:
+        401 error asking for bearer authentication
+    """
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=CREDENTIALS_ERROR_DETAIL,
+        headers=CREDENTIALS_ERROR_HEADERS,
+    )
+
+# Verified tokens (sha256(token) -> (username, expiration timestamp)), so
+# repeated requests skip JWT verification. Tokens are keyed by digest so raw
+# bearer tokens are not kept in memory.
+_token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+# User IDs by username, and the only user columns authentication needs by user
+# ID, so repeated requests skip the user lookup. Credentials are never cached.
+_user_ids: TTLCache = TTLCache(maxsize=1024, ttl=30)
+_user_cache: TTLCache = TTLCache(maxsize=1024, ttl=30)
+_cache_lock = threading.Lock()
+
+
+def decode_token_username(token: str) -> str:
+    """
+    Verifies a JWT token and returns the username it was issued for.
+    
+    Args:
+        token: JWT token from request
+        
+    Returns:
+        Username contained in the token
+        
+    Raises:
+        JWTError: If the token is invalid or expired
+        ValidationError: If the token payload is invalid
+    """
+    token_key = hashlib.sha256(token.encode()).digest()
+    with _cache_lock:
+        cached = _token_cache.get(token_key)
+    if cached is not None and cached[1] > time.time():
+        return cached[0]
+    
+    # Reject expired or subject-less tokens from their claims alone, before
+    # paying for signature verification
+    claims = jwt.get_unverified_claims(token)
+    expires_at = claims.get("exp")
+    if claims.get("sub") is None or (
+        isinstance(expires_at, (int, float)) and expires_at <= time.time()
+    ):
+        raise JWTError("Token is expired or has no subject")
+    
+    payload = jwt.decode(
+        token, JWT_KEY, algorithms=JWT_ALGORITHMS
+    )
+    username: Optional[str] = payload.get("sub")
+    if username is None:
+        raise JWTError("Token has no subject")
+    token_data = TokenData(username=username)
+    
+    with _cache_lock:
+        _token_cache[token_key] = (token_data.username, payload.get("exp", 0))
+    return token_data.username
+
+
+def get_user_by_username(db: Session, username: str) -> Optional[User]:
+    """
+    Gets a user by username, reusing recently loaded authentication columns.
+    
+    Cached users are attached to the given session without querying the
+    database, with only id, username and is_active loaded. Other columns are
+    loaded from the database when first accessed.
+    
+    Args:
+        db: Database session
+        username: Username to look up
+        
+    Returns:
+        User if found, None otherwise
+    """
+    with _cache_lock:
+        user_id = _user_ids.get(username)
+        values = _user_cache.get(user_id) if user_id is not None else None
+    if values is not None:
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+    
+    user = db.query(User).filter(User.username == username).first()
+    if user is not None:
+        with _cache_lock:
+            _user_ids[username] = user.id
+            _user_cache[user.id] = {
+                "id": user.id,
+                "username": user.username,
+                "is_active": user.is_active,
+            }
+    return user
+
 
 def get_current_user(
     db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
@@ -30,26 +143,14 @@ def get_current_user(
     Raises:
         HTTPException: If authentication fails
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        username: Optional[str] = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
+        username = decode_token_username(token)
     except (JWTError, ValidationError):
-        raise credentials_exception
+        raise _credentials_exception()
     
-    user = db.query(User).filter(User.username == token_data.username).first()
+    user = get_user_by_username(db, username)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
 
@@ -67,5 +168,5 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
         HTTPException: If user is inactive
     """
     if not current_user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
+        raise HTTPException(status_code=400, detail=INACTIVE_USER_DETAIL)
     return current_user 
\ No newline at end of file
@@ -2,6 +2,7 @@ from datetime import timedelta
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
@@ -57,8 +58,8 @@ async def setup(*, db: Session = Depends(get_db), user_in: UserCreate) -> Any:
             detail=f"Jeton API Cloudflare invalide: {str(e)}",
         )
 
-    # Créer l'utilisateur
-    user = UserService.create_user(db, user_in)
+    # Créer l'utilisateur (bcrypt hashing runs in the threadpool, off the event loop)
+    user = await run_in_threadpool(UserService.create_user, db, user_in)
     
     # Générer et retourner le token JWT
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -87,7 +88,9 @@ async def login(
     Raises:
         HTTPException: If the credentials are invalid
     """
-    user = UserService.authenticate(
+    # bcrypt verification runs in the threadpool so it doesn't block the event loop
+    user = await run_in_threadpool(
+        UserService.authenticate,
         db, username=form_data.username, password=form_data.password
     )
     if not user:
@@ -1,5 +1,9 @@
+import asyncio
 from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from ...db.session import get_db
@@ -8,7 +12,7 @@ from ...models.dns_record import DNSRecord
 from ...models.log import Log, LogLevel
 from ...schemas.dns import DNSRecordCreate, DNSRecordResponse, DNSRecordUpdate
 from ...services.user import UserService
-from ...services.cloudflare import CloudflareService
+from ...services.cloudflare import get_user_cf_service
 from ...services.log import LogService
 
 router = APIRouter()
@@ -29,11 +33,7 @@ async def get_zones(
         List of Cloudflare zones
     """
     try:
-        cf_service = CloudflareService(
-            current_user.cloudflare_api_key, 
-            current_user.cloudflare_email,
-            is_token=current_user.is_token
-        )
+        cf_service = get_user_cf_service(current_user)
         zones = await cf_service.get_zones()
         return {"zones": zones}
     except Exception as e:
@@ -42,7 +42,7 @@ async def get_zones(
             detail=f"Failed to get Cloudflare zones: {str(e)}",
         )
 
-@router.get("/records/{zone_id}", response_model=dict)
+@router.get("/records/{zone_id}", response_class=ORJSONResponse)
 async def get_dns_records(
     zone_id: str,
     db: Session = Depends(get_db),
@@ -60,36 +60,31 @@ async def get_dns_records(
         List of DNS records
     """
     try:
-        # Fetch from Cloudflare
-        cf_service = CloudflareService(
-            current_user.cloudflare_api_key, 
-            current_user.cloudflare_email,
-            is_token=current_user.is_token
-        )
-        cloudflare_records = await cf_service.get_dns_records(zone_id)
+        cf_service = get_user_cf_service(current_user)
         
-        # Fetch managed records from database
-        managed_records = db.query(DNSRecord).filter(
+        # Fetch only the columns needed for the merge (record_id -> auto_update)
+        managed_stmt = select(DNSRecord.record_id, DNSRecord.auto_update).where(
             DNSRecord.user_id == current_user.id,
             DNSRecord.zone_id == zone_id
-        ).all()
+        )
         
-        # Build a dict of managed records for quick lookup
-        managed_dict = {record.record_id: record for record in managed_records}
+        # Fetch from Cloudflare while the managed records are read in the threadpool
+        cloudflare_records, managed_rows = await asyncio.gather(
+            cf_service.get_dns_records(zone_id),
+            run_in_threadpool(lambda: db.execute(managed_stmt).all())
+        )
+        managed_dict = dict(managed_rows)
         
         # Merge Cloudflare data with DB data
         for record in cloudflare_records:
-            if record["id"] in managed_dict:
-                record["managed"] = True
-                record["auto_update"] = managed_dict[record["id"]].auto_update
-            else:
-                record["managed"] = False
-                record["auto_update"] = False
+            record["managed"] = record["id"] in managed_dict
+            record["auto_update"] = bool(managed_dict.get(record["id"]))
         
-        return {
+        # Raw Cloudflare dicts need no validation, serialize them directly
+        return ORJSONResponse({
             "records": cloudflare_records,
             "zone_id": zone_id
-        }
+        })
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -115,11 +110,7 @@ async def create_dns_record(
     """
     try:
         # Create record in Cloudflare
-        cf_service = CloudflareService(
-            current_user.cloudflare_api_key, 
-            current_user.cloudflare_email,
-            is_token=current_user.is_token
-        )
+        cf_service = get_user_cf_service(current_user)
         
         cf_record = await cf_service.create_dns_record(
             zone_id=record_in.zone_id,
@@ -200,11 +191,7 @@ async def update_dns_record(
     
     try:
         # Update record in Cloudflare
-        cf_service = CloudflareService(
-            current_user.cloudflare_api_key, 
-            current_user.cloudflare_email,
-            is_token=current_user.is_token
-        )
+        cf_service = get_user_cf_service(current_user)
         
         old_content = db_record.content
         
@@ -292,11 +279,7 @@ async def delete_dns_record(
         
         # Delete from Cloudflare if requested
         if delete_from_cloudflare:
-            cf_service = CloudflareService(
-                current_user.cloudflare_api_key, 
-                current_user.cloudflare_email,
-                is_token=current_user.is_token
-            )
+            cf_service = get_user_cf_service(current_user)
             
             success = await cf_service.delete_dns_record(
                 zone_id=db_record.zone_id,
@@ -14,24 +14,44 @@ class Settings(BaseSettings):
         SECRET_KEY: Secret key for token generation
         ACCESS_TOKEN_EXPIRE_MINUTES: JWT token expiration time
         ALGORITHM: Algorithm used for JWT token generation
+        PASSWORD_HASH_ROUNDS: bcrypt work factor (log2 of the rounds) for new password hashes
         DATABASE_URL: SQLite database connection URL
+        DB_POOL_SIZE: Number of connections kept open in the database pool
+        DB_MAX_OVERFLOW: Number of extra connections allowed beyond the pool size
+        DB_POOL_TIMEOUT: Seconds to wait for a connection from the pool
+        DB_POOL_RECYCLE: Seconds after which pooled connections are recycled
+        AUTO_CREATE_TABLES: Whether missing tables are created at startup
         CORS_ORIGINS: List of allowed CORS origins
         FIRST_TIME_SETUP: Boolean flag indicating if this is the first time the application is launched
+        CLOUDFLARE_MAX_CONCURRENCY: Maximum number of concurrent Cloudflare API calls for bulk operations
+        IP_VERIFY_WRITE_INTERVAL_MINUTES: Minimum minutes between database writes for an unchanged IP verification
     """
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
     ALGORITHM: str = "HS256"
+    PASSWORD_HASH_ROUNDS: int = 12
     
     # Clé d'encryption pour les données sensibles
     ENCRYPTION_KEY: str = ""
     
     # Database
     DATABASE_URL: str = f"sqlite:///{os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'cloudflare_linker.db')}"
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    AUTO_CREATE_TABLES: bool = True
     
     # First time setup
     FIRST_TIME_SETUP: bool = True
     
+    # Cloudflare
+    CLOUDFLARE_MAX_CONCURRENCY: int = 20
+    
+    # IP verification
+    IP_VERIFY_WRITE_INTERVAL_MINUTES: int = 5
+    
     # CORS
     CORS_ORIGINS: List[AnyHttpUrl] = []
 
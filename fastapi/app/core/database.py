@@ -1,24 +1,97 @@
-from sqlalchemy import create_engine
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 
 from .config import settings
 
 engine = create_engine(
-    settings.DATABASE_URL, connect_args={"check_same_thread": False}
+    settings.DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=True,
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        """
+        Tune each new SQLite connection.
+        
+        WAL lets readers run alongside the scheduler's writes, and the page
+        cache and memory-mapped I/O keep hot pages out of read() syscalls.
+        
+        Args:
+            dbapi_connection: Raw SQLite connection
+            connection_record: Pool record for the connection
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+
+# Objects keep their loaded state after commit, so responses built from them
+# don't trigger a reload SELECT
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+# Identifies the HTTP request being handled, set by DBSessionMiddleware
+_request_scope: ContextVar[Optional[object]] = ContextVar("request_scope", default=None)
+
+# One session per request, shared by every dependency and endpoint of that request
+ScopedSession = scoped_session(SessionLocal, scopefunc=_request_scope.get)
+
+
+class DBSessionMiddleware:
+    """
+    ASGI middleware scoping a database session to each HTTP request.
+    
+    The session is created lazily on first use and closed once the response
+    has been sent.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        token = _request_scope.set(object())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ScopedSession.remove()
+            _request_scope.reset(token)
 
 
 def get_db():
     """
     Dependency for getting a database session.
     
+    Inside a request handled by DBSessionMiddleware this is the request's
+    scoped session, otherwise a new session closed after use.
+    
     Yields:
         SQLAlchemy session
     """
+    if _request_scope.get() is not None:
+        yield ScopedSession()
+        return
+    
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
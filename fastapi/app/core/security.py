@@ -2,15 +2,26 @@ from datetime import datetime, timedelta
 from typing import Any, Optional, Union
 import os
 import base64
+import secrets
 
-from jose import jwt
-from passlib.context import CryptContext
+import bcrypt
+from jose import jwk, jwt
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 
 from .config import settings
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# JWT key and token settings resolved once instead of on every encode/decode
+JWT_KEY = jwk.construct(settings.SECRET_KEY, settings.ALGORITHM)
+JWT_ALGORITHM = settings.ALGORITHM
+JWT_ALGORITHMS = [settings.ALGORITHM]
+ACCESS_TOKEN_EXPIRE = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+# Password hashing, the work factor is stored in each hash so changing it keeps
+# existing hashes valid
+PASSWORD_HASH_ROUNDS = settings.PASSWORD_HASH_ROUNDS
 
 # Encryption for sensitive data like API keys
 # Utilise une clé d'encryption fixe depuis les settings au lieu d'en générer une nouvelle à chaque démarrage
@@ -26,6 +37,16 @@ except Exception:
     # Si la clé n'est pas au bon format, créer une clé valide
     fernet = Fernet(Fernet.generate_key())
 
+# AES-256-GCM for new ciphertexts, with its key derived once from the encryption key.
+# Fernet is kept to decrypt values stored before the switch.
+AESGCM_PREFIX = "v2:"
+aesgcm = AESGCM(HKDF(
+    algorithm=hashes.SHA256(),
+    length=32,
+    salt=None,
+    info=b"cloudflare-linker api key",
+).derive(ENCRYPTION_KEY.encode()))
+
 
 def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
@@ -41,10 +62,10 @@ def create_access_token(subject: Union[str, Any], expires_delta: Optional[timede
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = datetime.utcnow() + ACCESS_TOKEN_EXPIRE
     
     to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, JWT_KEY, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
 
@@ -52,6 +73,8 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verifies a password against its hash.
     
+    Malformed hashes never match.
+    
     Args:
         plain_password: Plain text password
         hashed_password: Hashed password to verify against
@@ -59,12 +82,15 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    except ValueError:
+        return False
 
 
 def get_password_hash(password: str) -> str:
     """
-    Creates a hash of the password.
+    Creates a bcrypt hash of the password with PASSWORD_HASH_ROUNDS.
     
     Args:
         password: Plain text password
@@ -72,12 +98,17 @@ def get_password_hash(password: str) -> str:
     Returns:
         Hashed password
     """
-    return pwd_context.hash(password)
+    salt = bcrypt.gensalt(rounds=PASSWORD_HASH_ROUNDS)
+    return bcrypt.hashpw(password.encode(), salt).decode()
+
+
+# Hash checked against when a user doesn't exist, so that login takes the same time either way
+DUMMY_PASSWORD_HASH = get_password_hash(secrets.token_urlsafe(16))
 
 
 def encrypt_api_key(api_key: str) -> str:
     """
-    Encrypts sensitive data like API keys.
+    Encrypts sensitive data like API keys with AES-256-GCM.
     
     Args:
         api_key: API key to encrypt
@@ -85,12 +116,14 @@ def encrypt_api_key(api_key: str) -> str:
     Returns:
         Encrypted API key
     """
-    return fernet.encrypt(api_key.encode()).decode()
+    nonce = os.urandom(12)
+    ciphertext = aesgcm.encrypt(nonce, api_key.encode(), None)
+    return AESGCM_PREFIX + base64.urlsafe_b64encode(nonce + ciphertext).decode()
 
 
 def decrypt_api_key(encrypted_api_key: str) -> str:
     """
-    Decrypts encrypted API keys.
+    Decrypts encrypted API keys, either AES-GCM or legacy Fernet ciphertexts.
     
     Args:
         encrypted_api_key: Encrypted API key
@@ -99,6 +132,9 @@ def decrypt_api_key(encrypted_api_key: str) -> str:
         Decrypted API key
     """
     try:
+        if encrypted_api_key.startswith(AESGCM_PREFIX):
+            data = base64.urlsafe_b64decode(encrypted_api_key[len(AESGCM_PREFIX):])
+            return aesgcm.decrypt(data[:12], data[12:], None).decode()
         return fernet.decrypt(encrypted_api_key.encode()).decode()
     except Exception:
         # Comme nous avons eu un problème de déchiffrement, c'est probablement parce que
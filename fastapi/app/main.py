@@ -2,12 +2,16 @@ import os
 import logging
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
 from .api.api_v1.api import api_router
 from .core.config import settings
-from .core.database import engine, get_db
+from .core.database import engine, get_db, SessionLocal, DBSessionMiddleware
 from .models.base import Base
+from .models.user import User
+from .services.cloudflare import close_http_client
+from .services.log_service import start_log_writer, stop_log_writer
 from .services.scheduler import dns_scheduler
 
 # Configure logging
@@ -17,23 +21,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 app = FastAPI(
     title="Cloudflare Linker API",
     description="API for managing DNS records via Cloudflare API",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse
 )
 
 # Set up CORS
+# Origins are kept in a frozenset so each request's Origin check is a hash
+# lookup. Browsers send origins without the trailing slash AnyHttpUrl adds.
+CORS_ALLOWED_ORIGINS = frozenset(str(origin).rstrip("/") for origin in settings.CORS_ORIGINS)
+
 if settings.CORS_ORIGINS:
     app.add_middleware(
         CORSMiddleware,
-        allow_origins=[str(origin) for origin in settings.CORS_ORIGINS],
+        allow_origins=CORS_ALLOWED_ORIGINS,
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 else:
     # During development, allow all origins
@@ -43,8 +50,12 @@ else:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 
+# Scope one database session to each request
+app.add_middleware(DBSessionMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -65,8 +76,23 @@ async def startup_event():
     """
     Startup event handler.
     
-    Initializes the DNS update scheduler.
+    Creates missing tables when AUTO_CREATE_TABLES is enabled, disables
+    first-time setup if users already exist, starts the background log
+    writer and initializes the DNS update scheduler.
     """
+    # Create database tables
+    if settings.AUTO_CREATE_TABLES:
+        Base.metadata.create_all(bind=engine)
+    
+    db = SessionLocal()
+    try:
+        if db.query(User.id).first() is not None:
+            settings.FIRST_TIME_SETUP = False
+    finally:
+        db.close()
+    
+    start_log_writer()
+    
     try:
         logger.info("Starting DNS update scheduler")
         dns_scheduler.start()
@@ -80,11 +106,15 @@ async def shutdown_event():
     """
     Shutdown event handler.
     
-    Stops the DNS update scheduler.
+    Stops the DNS update scheduler, writes the logs still queued and closes
+    the Cloudflare HTTP client.
     """
     try:
         logger.info("Stopping DNS update scheduler")
         dns_scheduler.stop()
         logger.info("DNS update scheduler stopped successfully")
     except Exception as e:
-        logger.error(f"Error stopping DNS update scheduler: {e}") 
\ No newline at end of file
+        logger.error(f"Error stopping DNS update scheduler: {e}")
+    
+    await stop_log_writer()
+    await close_http_client() 
\ No newline at end of file
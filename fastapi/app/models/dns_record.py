@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, Text
+from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
@@ -21,11 +21,17 @@ class DNSRecord(BaseModel):
         last_updated_ip: The IP that was last set
     """
     __tablename__ = "dns_records"
+    __table_args__ = (
+        Index("ix_dns_user_type", "user_id", "record_type"),
+        Index("ix_dns_user_zone", "user_id", "zone_id"),
+        Index("ix_dns_auto_update_user", "auto_update", "user_id"),
+        UniqueConstraint("user_id", "record_id", name="uq_dns_user_record"),
+    )
     
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    zone_id = Column(String(32), index=True, nullable=False)
+    zone_id = Column(String(32), nullable=False)
     zone_name = Column(String(255), nullable=False)
-    record_id = Column(String(32), index=True, nullable=False)
+    record_id = Column(String(32), nullable=False)
     record_type = Column(String(10), nullable=False)
     record_name = Column(String(255), nullable=False)
     content = Column(String(255), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, Enum
+from sqlalchemy import Column, String, Integer, ForeignKey, Text, Enum, Index
 from sqlalchemy.orm import relationship
 import enum
 from .base import BaseModel
@@ -27,6 +27,10 @@ class Log(BaseModel):
         dns_record_id: Related DNS record ID (optional)
     """
     __tablename__ = "logs"
+    __table_args__ = (
+        # Serves the per-user and system (user_id IS NULL) listings ordered by id
+        Index("ix_logs_user_id_id", "user_id", "id"),
+    )
     
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     level = Column(Enum(LogLevel), default=LogLevel.INFO, nullable=False)
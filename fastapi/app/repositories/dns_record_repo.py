@@ -1,8 +1,22 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, joinedload
 from ..models.dns_record import DNSRecord
 
 
+# Columns DnsRecordRepo.update may change
+UPDATABLE_FIELDS = frozenset({
+    "record_type",
+    "record_name",
+    "content",
+    "ttl",
+    "proxied",
+    "auto_update",
+    "last_updated_ip",
+})
+
+
 class DnsRecordRepo:
     """
     Repository for DNS record database operations.
@@ -59,9 +73,38 @@ class DnsRecordRepo:
         
         db.add(dns_record)
         db.commit()
-        db.refresh(dns_record)
         return dns_record
     
+    @staticmethod
+    def bulk_create(
+        db: Session,
+        rows: List[Dict[str, Any]],
+        ignore_existing: bool = False
+    ) -> None:
+        """
+        Create many DNS records with a single INSERT statement.
+        
+        Args:
+            db: Database session
+            rows: Column values (user_id, zone_id, record_id, ...) for each record
+            ignore_existing: Skip rows whose (user_id, record_id) already exists
+                instead of failing, on PostgreSQL and SQLite
+        """
+        if not rows:
+            return
+        
+        dialect = db.get_bind().dialect.name
+        if ignore_existing and dialect in ("postgresql", "sqlite"):
+            dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = dialect_insert(DNSRecord).on_conflict_do_nothing(
+                index_elements=["user_id", "record_id"]
+            )
+        else:
+            stmt = insert(DNSRecord)
+        
+        db.execute(stmt, rows)
+        db.commit()
+    
     @staticmethod
     def get_by_id(db: Session, record_id: int) -> Optional[DNSRecord]:
         """
@@ -74,7 +117,7 @@ class DnsRecordRepo:
         Returns:
             DNS record if found, None otherwise
         """
-        return db.query(DNSRecord).filter(DNSRecord.id == record_id).first()
+        return db.get(DNSRecord, record_id)
     
     @staticmethod
     def get_by_user_id(db: Session, user_id: int) -> List[DNSRecord]:
@@ -88,26 +131,51 @@ class DnsRecordRepo:
         Returns:
             List of DNS records
         """
-        return db.query(DNSRecord).filter(DNSRecord.user_id == user_id).all()
+        stmt = select(DNSRecord).where(DNSRecord.user_id == user_id)
+        return db.execute(stmt).scalars().all()
     
     @staticmethod
-    def get_all_auto_update(db: Session) -> List[DNSRecord]:
+    def get_all_auto_update(
+        db: Session,
+        record_types: Optional[Iterable[str]] = None,
+        outdated_for_ip: Optional[str] = None
+    ) -> List[DNSRecord]:
         """
         Get all DNS records with auto_update enabled.
         
+        The owning users are joined into the same query, so callers can read
+        record.user without one query per record.
+        Records are ordered by user_id so they can be grouped per user with
+        itertools.groupby.
+        
         Args:
             db: Database session
+            record_types: Optional record types to restrict the result to
+            outdated_for_ip: Only return records whose content differs from this IP
             
         Returns:
-            List of DNS records with auto_update enabled
+            List of DNS records with auto_update enabled, ordered by user_id
         """
-        return db.query(DNSRecord).filter(DNSRecord.auto_update == True).all()
+        stmt = (
+            select(DNSRecord)
+            .options(joinedload(DNSRecord.user))
+            .where(DNSRecord.auto_update.is_(True))
+            .order_by(DNSRecord.user_id, DNSRecord.id)
+        )
+        if record_types is not None:
+            stmt = stmt.where(DNSRecord.record_type.in_(list(record_types)))
+        if outdated_for_ip is not None:
+            stmt = stmt.where(DNSRecord.content != outdated_for_ip)
+        return db.execute(stmt).scalars().all()
     
     @staticmethod
     def update(db: Session, record_id: int, **kwargs) -> Optional[DNSRecord]:
         """
         Update a DNS record.
         
+        Fields outside UPDATABLE_FIELDS are ignored. The record is updated and
+        returned by a single UPDATE ... RETURNING statement.
+        
         Args:
             db: Database session
             record_id: ID of the record to update
@@ -116,18 +184,59 @@ class DnsRecordRepo:
         Returns:
             Updated DNS record if found, None otherwise
         """
-        record = db.query(DNSRecord).filter(DNSRecord.id == record_id).first()
-        if not record:
-            return None
-            
-        for key, value in kwargs.items():
-            if hasattr(record, key):
-                setattr(record, key, value)
-                
+        fields = {key: value for key, value in kwargs.items() if key in UPDATABLE_FIELDS}
+        if not fields:
+            return db.get(DNSRecord, record_id)
+        
+        stmt = (
+            update(DNSRecord)
+            .where(DNSRecord.id == record_id)
+            .values(**fields)
+            .returning(DNSRecord)
+        )
+        record = db.execute(stmt).scalar_one_or_none()
         db.commit()
-        db.refresh(record)
         return record
     
+    @staticmethod
+    def bulk_set_ip(
+        db: Session,
+        new_ip: str,
+        record_ids: Optional[Iterable[int]] = None,
+        commit: bool = True
+    ) -> int:
+        """
+        Set the content and last_updated_ip of many DNS records in one UPDATE.
+        
+        Records already pointing at new_ip are not matched.
+        
+        Args:
+            db: Database session
+            new_ip: The new IP address
+            record_ids: IDs of the records to update, or None for every
+                record with auto_update enabled
+            commit: Whether to commit immediately, or leave the update to the
+                caller's commit
+            
+        Returns:
+            Number of records updated
+        """
+        stmt = (
+            update(DNSRecord)
+            .where(DNSRecord.content != new_ip)
+            .values(content=new_ip, last_updated_ip=new_ip)
+            .execution_options(synchronize_session=False)
+        )
+        if record_ids is None:
+            stmt = stmt.where(DNSRecord.auto_update.is_(True))
+        else:
+            stmt = stmt.where(DNSRecord.id.in_(list(record_ids)))
+        
+        result = db.execute(stmt)
+        if commit:
+            db.commit()
+        return result.rowcount
+    
     @staticmethod
     def delete(db: Session, record_id: int) -> bool:
         """
@@ -140,7 +249,7 @@ class DnsRecordRepo:
         Returns:
             True if record was deleted, False otherwise
         """
-        record = db.query(DNSRecord).filter(DNSRecord.id == record_id).first()
+        record = db.get(DNSRecord, record_id)
         if not record:
             return False
             
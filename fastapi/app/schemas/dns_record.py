@@ -1,5 +1,10 @@
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from ..services.ip_service import IPService
+
+# Record types whose content is an IP address
+IP_RECORD_TYPES = ("A", "AAAA")
 
 
 class DNSRecordBase(BaseModel):
@@ -30,7 +35,19 @@ class DNSRecordCreate(DNSRecordBase):
     """
     Schema for DNS record creation.
     """
-    pass
+    
+    @model_validator(mode="after")
+    def normalize_ip_content(self):
+        """
+        Stores the content of A and AAAA records in canonical IP form, so it
+        compares equal to the current IP as a plain string.
+        
+        Returns:
+            Record with normalized content
+        """
+        if self.record_type in IP_RECORD_TYPES:
+            self.content = IPService.normalize_ip(self.content)
+        return self
 
 
 class DNSRecordUpdate(BaseModel):
@@ -51,6 +68,23 @@ class DNSRecordUpdate(BaseModel):
     ttl: Optional[int] = None
     proxied: Optional[bool] = None
     auto_update: Optional[bool] = None
+    
+    @model_validator(mode="after")
+    def normalize_ip_content(self):
+        """
+        Stores new IP content in canonical form, like DNSRecordCreate.
+        
+        When the record type isn't changed, content that is a valid IP address
+        is normalized, as only A and AAAA records hold one.
+        
+        Returns:
+            Update with normalized content
+        """
+        if self.content is not None and (
+            self.record_type is None or self.record_type in IP_RECORD_TYPES
+        ):
+            self.content = IPService.normalize_ip(self.content)
+        return self
 
 
 class DNSRecordInDB(DNSRecordBase):
@@ -68,11 +102,8 @@ class DNSRecordInDB(DNSRecordBase):
     record_id: str
     last_updated_ip: Optional[str] = None
     
-    class Config:
-        """
-        Pydantic configuration for ORM mode.
-        """
-        orm_mode = True
+    # Lets the schema be built from ORM objects
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DNSRecord(DNSRecordInDB):
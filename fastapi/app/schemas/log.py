@@ -1,5 +1,5 @@
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 from ..models.log import LogLevel
 
@@ -47,11 +47,8 @@ class LogInDB(LogBase):
     user_id: Optional[int] = None
     dns_record_id: Optional[int] = None
     
-    class Config:
-        """
-        Pydantic configuration for ORM mode.
-        """
-        orm_mode = True
+    # Lets the schema be built from ORM objects
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Log(LogInDB):
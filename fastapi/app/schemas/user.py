@@ -1,5 +1,5 @@
 from typing import Optional
-from pydantic import BaseModel, EmailStr, validator, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, field_validator, Field
 
 
 class UserBase(BaseModel):
@@ -16,22 +16,35 @@ class UserBase(BaseModel):
     is_active: bool = True
 
 
-class UserCreate(UserBase):
+def check_password_strength(password: str) -> str:
     """
-    Schema for user creation.
+    Validates that a password meets security requirements.
+    
+    Args:
+        password: Password to validate
+        
+    Returns:
+        Validated password
+        
+    Raises:
+        ValueError: If password is too short
+    """
+    if len(password) < 8:
+        raise ValueError("Password must be at least 8 characters")
+    return password
+
+
+class StrongPasswordMixin(BaseModel):
+    """
+    Password field shared by the schemas creating a user.
     
     Attributes:
         password: Plain text password (will be hashed)
-        cloudflare_api_key: Cloudflare API key (token)
-        cloudflare_email: Email associated with Cloudflare account (optional with token)
-        is_token: Always True, only token authentication is supported
     """
     password: str
-    cloudflare_api_key: str
-    cloudflare_email: Optional[EmailStr] = None
-    is_token: bool = True
     
-    @validator("password")
+    @field_validator("password")
+    @classmethod
     def password_must_be_strong(cls, v):
         """
         Validates that the password meets security requirements.
@@ -45,11 +58,20 @@ class UserCreate(UserBase):
         Raises:
             ValueError: If password is too short
         """
-        if len(v) < 8:
-            raise ValueError("Password must be at least 8 characters")
-        return v
+        return check_password_strength(v)
+
+
+class TokenOnlyMixin(BaseModel):
+    """
+    Cloudflare authentication mode shared by the schemas creating a user.
     
-    @validator("is_token")
+    Attributes:
+        is_token: Always True, only token authentication is supported
+    """
+    is_token: bool = True
+    
+    @field_validator("is_token")
+    @classmethod
     def must_use_token(cls, v):
         """
         Validates that only token authentication is used.
@@ -68,7 +90,21 @@ class UserCreate(UserBase):
         return v
 
 
-class FirstTimeSetup(BaseModel):
+class UserCreate(UserBase, StrongPasswordMixin, TokenOnlyMixin):
+    """
+    Schema for user creation.
+    
+    Attributes:
+        password: Plain text password (will be hashed)
+        cloudflare_api_key: Cloudflare API key (token)
+        cloudflare_email: Email associated with Cloudflare account (optional with token)
+        is_token: Always True, only token authentication is supported
+    """
+    cloudflare_api_key: str
+    cloudflare_email: Optional[EmailStr] = None
+
+
+class FirstTimeSetup(StrongPasswordMixin, TokenOnlyMixin):
     """
     Schema for first-time setup with admin user creation.
     
@@ -81,47 +117,9 @@ class FirstTimeSetup(BaseModel):
         is_token: Always True, only token authentication is supported
     """
     username: str
-    password: str
     email: EmailStr
     cloudflare_api_key: str
     cloudflare_email: Optional[EmailStr] = None
-    is_token: bool = True
-    
-    @validator("password")
-    def password_must_be_strong(cls, v):
-        """
-        Validates that the password meets security requirements.
-        
-        Args:
-            v: Password to validate
-            
-        Returns:
-            Validated password
-            
-        Raises:
-            ValueError: If password is too short
-        """
-        if len(v) < 8:
-            raise ValueError("Password must be at least 8 characters")
-        return v
-    
-    @validator("is_token")
-    def must_use_token(cls, v):
-        """
-        Validates that only token authentication is used.
-        
-        Args:
-            v: is_token value
-            
-        Returns:
-            Validated value (must be True)
-            
-        Raises:
-            ValueError: If is_token is False
-        """
-        if not v:
-            raise ValueError("Seule l'authentification par jeton API est supportée")
-        return v
 
 
 class UserUpdate(BaseModel):
@@ -151,7 +149,8 @@ class UserPasswordUpdate(BaseModel):
     current_password: str
     new_password: str
     
-    @validator("new_password")
+    @field_validator("new_password")
+    @classmethod
     def password_must_be_strong(cls, v):
         """
         Validates that the new password meets security requirements.
@@ -165,9 +164,7 @@ class UserPasswordUpdate(BaseModel):
         Raises:
             ValueError: If password is too short
         """
-        if len(v) < 8:
-            raise ValueError("Password must be at least 8 characters")
-        return v
+        return check_password_strength(v)
 
 
 class UserInDB(UserBase):
@@ -185,11 +182,8 @@ class UserInDB(UserBase):
     cloudflare_email: Optional[EmailStr] = None
     is_token: bool = False
     
-    class Config:
-        """
-        Pydantic configuration for ORM mode.
-        """
-        orm_mode = True
+    # Lets the schema be built from ORM objects
+    model_config = ConfigDict(from_attributes=True)
 
 
 class User(UserInDB):
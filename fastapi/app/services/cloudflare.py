@@ -1,11 +1,168 @@
+import asyncio
+import hashlib
 import httpx
 import logging
-from typing import Dict, List, Optional, Any
-import json
+import random
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, List, Optional, Any
+import orjson
+from cachetools import LRUCache
+from cachetools.func import ttl_cache
 from ..core.security import decrypt_api_key
 
+if TYPE_CHECKING:
+    from ..models.user import User
+
 logger = logging.getLogger(__name__)
 
+# HTTP client shared by all Cloudflare services, so connections to the API are kept alive
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared HTTP client for the Cloudflare API, creating it on first use.
+    
+    Returns:
+        Shared HTTP/2 client with a keep-alive connection pool and JSON headers
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
+            headers={"Content-Type": "application/json"}
+        )
+    return _http_client
+
+
+# Cap on requests in flight at once over the shared client, so concurrent
+# updates are multiplexed as HTTP/2 streams without overrunning the pool
+MAX_IN_FLIGHT_REQUESTS = 64
+_request_semaphore: Optional[asyncio.Semaphore] = None
+
+# Requests sent and connections opened by the shared client, logged every
+# HTTP_STATS_LOG_INTERVAL requests to follow how well connections are reused
+HTTP_STATS_LOG_INTERVAL = 500
+_http_stats = {"requests": 0, "connections": 0}
+
+
+def _get_request_semaphore() -> asyncio.Semaphore:
+    """
+    Get the semaphore limiting requests in flight, creating it on first use.
+    
+    Returns:
+        Semaphore shared by all Cloudflare services
+    """
+    global _request_semaphore
+    if _request_semaphore is None:
+        _request_semaphore = asyncio.Semaphore(MAX_IN_FLIGHT_REQUESTS)
+    return _request_semaphore
+
+
+async def _trace_connections(event_name: str, info: Dict[str, Any]) -> None:
+    """
+    httpcore trace hook counting the connections opened to the API.
+    
+    Args:
+        event_name: Name of the traced event
+        info: Event details
+    """
+    if event_name == "connection.connect_tcp.complete":
+        _http_stats["connections"] += 1
+
+
+def _record_request() -> None:
+    """
+    Count a request sent to the API and periodically log connection reuse.
+    """
+    _http_stats["requests"] += 1
+    requests = _http_stats["requests"]
+    if requests % HTTP_STATS_LOG_INTERVAL == 0:
+        connections = _http_stats["connections"]
+        reused = 1 - connections / requests
+        logger.info(
+            f"Cloudflare API: {requests} requests over {connections} connections ({reused:.0%} reused)"
+        )
+
+
+async def close_http_client() -> None:
+    """
+    Close the shared HTTP client and its pooled connections.
+    """
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _parse_json(response: httpx.Response) -> Any:
+    """
+    Parse a Cloudflare response body with orjson instead of the stdlib parser.
+    
+    Args:
+        response: HTTP response with a JSON body
+        
+    Returns:
+        Decoded JSON body
+    """
+    return orjson.loads(response.content)
+
+
+@lru_cache(maxsize=256)
+def _decrypt_api_key_cached(encrypted_api_key: str) -> str:
+    """
+    Decrypt a stored API token, memoized per ciphertext.
+    
+    Args:
+        encrypted_api_key: Encrypted Cloudflare API token
+        
+    Returns:
+        Decrypted API token
+    """
+    return decrypt_api_key(encrypted_api_key)
+
+
+# Cached list responses: (token hash, path) -> (expires_at, etag, result).
+# Entries outlive their TTL so their ETag can still be used for revalidation.
+_response_cache: LRUCache = LRUCache(maxsize=4096)
+
+# Seconds a fetched list is served before being revalidated with Cloudflare
+ZONES_CACHE_TTL = 300.0
+RECORDS_CACHE_TTL = 60.0
+
+
+# Retries of requests rate-limited (429) or failed server-side (5xx) by Cloudflare.
+# Delays double from RETRY_BACKOFF_BASE unless Cloudflare sends Retry-After.
+MAX_RETRIES = 3
+RETRY_BACKOFF_BASE = 1.0
+RETRY_MAX_DELAY = 30.0
+
+# Methods safe to send again after a 5xx, the request may have been applied
+IDEMPOTENT_METHODS = frozenset({"GET", "PUT", "DELETE"})
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    """
+    Compute how long to wait before retrying a failed request.
+    
+    Args:
+        response: Response of the failed attempt
+        attempt: Number of the failed attempt, starting at 0
+        
+    Returns:
+        Delay in seconds, honoring Retry-After and with a little jitter
+    """
+    try:
+        delay = float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        delay = RETRY_BACKOFF_BASE * 2 ** attempt
+    return min(delay, RETRY_MAX_DELAY) + random.uniform(0, 0.2)
+
+
 class CloudflareService:
     """
     Service for interacting with the Cloudflare API.
@@ -27,17 +184,21 @@ class CloudflareService:
             
         try:
             # Essayer de déchiffrer le jeton
-            self.api_key = decrypt_api_key(api_key) if is_encrypted else api_key
+            self.api_key = _decrypt_api_key_cached(api_key) if is_encrypted else api_key
         except Exception as e:
             # En cas d'échec, utiliser le jeton tel quel et logger l'erreur
             logger.warning(f"Failed to decrypt API token, using as-is: {str(e)}")
             self.api_key = api_key
         
         # Utilisation de l'authentification par token
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        # (Content-Type is set once on the shared HTTP client, which can't carry
+        # a per-user Authorization). Read-only as cached instances are shared.
+        self.headers = MappingProxyType({
+            "Authorization": f"Bearer {self.api_key}"
+        })
+        
+        # Cached responses are scoped to the token without keeping it as a key
+        self._cache_scope = hashlib.sha256(self.api_key.encode()).hexdigest()
     
     async def get_zones(self) -> List[Dict[str, Any]]:
         """
@@ -47,21 +208,7 @@ class CloudflareService:
             List of zone dictionaries
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.API_BASE_URL}/zones",
-                    headers=self.headers
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data["success"]:
-                        return data["result"]
-                    logger.error(f"Cloudflare API error: {data.get('errors', 'Unknown error')}")
-                    return []
-                else:
-                    logger.error(f"Cloudflare API responded with status {response.status_code}: {response.text}")
-                    return []
+            return await self._get_cached_list("/zones", ZONES_CACHE_TTL)
         except Exception as e:
             logger.error(f"Error fetching Cloudflare zones: {str(e)}")
             return []
@@ -77,25 +224,123 @@ class CloudflareService:
             List of DNS record dictionaries
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.API_BASE_URL}/zones/{zone_id}/dns_records",
-                    headers=self.headers
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data["success"]:
-                        return data["result"]
-                    logger.error(f"Cloudflare API error: {data.get('errors', 'Unknown error')}")
-                    return []
-                else:
-                    logger.error(f"Cloudflare API responded with status {response.status_code}: {response.text}")
-                    return []
+            return await self._get_cached_list(f"/zones/{zone_id}/dns_records", RECORDS_CACHE_TTL)
         except Exception as e:
             logger.error(f"Error fetching DNS records: {str(e)}")
             return []
     
+    async def get_dns_records_bulk(
+        self,
+        zone_ids: List[str],
+        max_concurrency: int = 16
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get the DNS records of several zones concurrently.
+        
+        Args:
+            zone_ids: Cloudflare zone IDs
+            max_concurrency: Maximum number of requests in flight at once
+            
+        Returns:
+            Dictionary mapping each zone ID to its list of DNS records
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def fetch_zone(zone_id: str):
+            async with semaphore:
+                return zone_id, await self.get_dns_records(zone_id)
+        
+        return dict(await asyncio.gather(*(fetch_zone(zone_id) for zone_id in zone_ids)))
+    
+    async def _get_cached_list(self, path: str, ttl: float) -> List[Dict[str, Any]]:
+        """
+        GET a Cloudflare list endpoint, serving it from the response cache when fresh.
+        
+        Once a cached entry expires it is revalidated with If-None-Match, so an
+        unchanged list costs a 304 without a body to parse.
+        
+        Args:
+            path: API path relative to API_BASE_URL
+            ttl: Seconds a fetched list is served without asking Cloudflare
+            
+        Returns:
+            List of result dictionaries, empty if the request failed. Callers
+            get shallow copies, so editing them leaves the cached list intact.
+        """
+        cache_key = (self._cache_scope, path)
+        cached = _response_cache.get(cache_key)
+        now = time.monotonic()
+        if cached is not None and now < cached[0]:
+            return [dict(result) for result in cached[2]]
+        
+        headers = self.headers
+        if cached is not None and cached[1]:
+            headers = {**self.headers, "If-None-Match": cached[1]}
+        
+        response = await self._request("GET", path, headers=headers)
+        
+        if response.status_code == 304 and cached is not None:
+            _response_cache[cache_key] = (now + ttl, cached[1], cached[2])
+            return [dict(result) for result in cached[2]]
+        
+        if response.status_code == 200:
+            data = _parse_json(response)
+            if data["success"]:
+                _response_cache[cache_key] = (now + ttl, response.headers.get("etag"), data["result"])
+                return [dict(result) for result in data["result"]]
+            logger.error(f"Cloudflare API error: {data.get('errors', 'Unknown error')}")
+            return []
+        
+        logger.error(f"Cloudflare API responded with status {response.status_code}: {response.text}")
+        return []
+    
+    def _invalidate_dns_records(self, zone_id: str) -> None:
+        """
+        Drop the cached record list of a zone after it was modified.
+        
+        Args:
+            zone_id: Cloudflare zone ID
+        """
+        _response_cache.pop((self._cache_scope, f"/zones/{zone_id}/dns_records"), None)
+    
+    async def _request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        """
+        Send a request to the Cloudflare API, retrying transient failures.
+        
+        At most MAX_IN_FLIGHT_REQUESTS requests are sent at once. 429 responses
+        are retried for every method, 5xx responses only for idempotent ones,
+        up to MAX_RETRIES times.
+        
+        Args:
+            method: HTTP method
+            path: API path relative to API_BASE_URL
+            **kwargs: Extra arguments for httpx, headers default to self.headers
+            
+        Returns:
+            Response of the last attempt
+        """
+        kwargs.setdefault("headers", self.headers)
+        kwargs.setdefault("extensions", {"trace": _trace_connections})
+        client = get_http_client()
+        semaphore = _get_request_semaphore()
+        url = f"{self.API_BASE_URL}{path}"
+        
+        for attempt in range(MAX_RETRIES + 1):
+            async with semaphore:
+                response = await client.request(method, url, **kwargs)
+            _record_request()
+            
+            status_code = response.status_code
+            retryable = status_code == 429 or (status_code >= 500 and method in IDEMPOTENT_METHODS)
+            if not retryable or attempt == MAX_RETRIES:
+                return response
+            
+            delay = _retry_delay(response, attempt)
+            logger.warning(f"Cloudflare API responded with status {status_code}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        
+        return response
+    
     async def create_dns_record(
         self,
         zone_id: str,
@@ -128,22 +373,22 @@ class CloudflareService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.API_BASE_URL}/zones/{zone_id}/dns_records",
-                    headers=self.headers,
-                    json=payload
-                )
-                
-                if response.status_code in (200, 201):
-                    data = response.json()
-                    if data["success"]:
-                        return data["result"]
-                    logger.error(f"Cloudflare API error: {data.get('errors', 'Unknown error')}")
-                    return None
-                else:
-                    logger.error(f"Cloudflare API responded with status {response.status_code}: {response.text}")
-                    return None
+            response = await self._request(
+                "POST",
+                f"/zones/{zone_id}/dns_records",
+                content=orjson.dumps(payload)
+            )
+            
+            if response.status_code in (200, 201):
+                data = _parse_json(response)
+                if data["success"]:
+                    self._invalidate_dns_records(zone_id)
+                    return data["result"]
+                logger.error(f"Cloudflare API error: {data.get('errors', 'Unknown error')}")
+                return None
+            else:
+                logger.error(f"Cloudflare API responded with status {response.status_code}: {response.text}")
+                return None
         except Exception as e:
             logger.error(f"Error creating DNS record: {str(e)}")
             return None
@@ -182,22 +427,22 @@ class CloudflareService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.put(
-                    f"{self.API_BASE_URL}/zones/{zone_id}/dns_records/{record_id}",
-                    headers=self.headers,
-                    json=payload
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data["success"]:
-                        return data["result"]
-                    logger.error(f"Cloudflare API error: {data.get('errors', 'Unknown error')}")
-                    return None
-                else:
-                    logger.error(f"Cloudflare API responded with status {response.status_code}: {response.text}")
-                    return None
+            response = await self._request(
+                "PUT",
+                f"/zones/{zone_id}/dns_records/{record_id}",
+                content=orjson.dumps(payload)
+            )
+            
+            if response.status_code == 200:
+                data = _parse_json(response)
+                if data["success"]:
+                    self._invalidate_dns_records(zone_id)
+                    return data["result"]
+                logger.error(f"Cloudflare API error: {data.get('errors', 'Unknown error')}")
+                return None
+            else:
+                logger.error(f"Cloudflare API responded with status {response.status_code}: {response.text}")
+                return None
         except Exception as e:
             logger.error(f"Error updating DNS record: {str(e)}")
             return None
@@ -218,18 +463,58 @@ class CloudflareService:
             True if deleted successfully, False otherwise
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(
-                    f"{self.API_BASE_URL}/zones/{zone_id}/dns_records/{record_id}",
-                    headers=self.headers
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return data["success"]
-                else:
-                    logger.error(f"Cloudflare API responded with status {response.status_code}: {response.text}")
-                    return False
+            response = await self._request(
+                "DELETE",
+                f"/zones/{zone_id}/dns_records/{record_id}"
+            )
+            
+            if response.status_code == 200:
+                data = _parse_json(response)
+                if data["success"]:
+                    self._invalidate_dns_records(zone_id)
+                return data["success"]
+            else:
+                logger.error(f"Cloudflare API responded with status {response.status_code}: {response.text}")
+                return False
         except Exception as e:
             logger.error(f"Error deleting DNS record: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
+
+
+@ttl_cache(maxsize=1024, ttl=300)
+def get_cf_service(
+    user_id: int,
+    api_key: str,
+    email: Optional[str] = None,
+    is_token: bool = True
+) -> CloudflareService:
+    """
+    Get a Cloudflare service for a user, reusing a cached instance when possible.
+    
+    Instances are cached per user and encrypted API key for a few minutes so the
+    API key is only decrypted once instead of on every request. Changing the
+    stored API key produces a new cache entry.
+    
+    Args:
+        user_id: ID of the user owning the credentials
+        api_key: Encrypted Cloudflare API token
+        email: Optional Cloudflare account email
+        is_token: Always True, only token authentication is supported
+        
+    Returns:
+        Cloudflare service for the user
+    """
+    return CloudflareService(api_key=api_key, email=email, is_token=is_token)
+
+
+def get_user_cf_service(user: "User") -> CloudflareService:
+    """
+    Get the cached Cloudflare service for a user's stored credentials.
+    
+    Args:
+        user: User owning the Cloudflare credentials
+        
+    Returns:
+        Cloudflare service for the user
+    """
+    return get_cf_service(user.id, user.cloudflare_api_key, user.cloudflare_email)
@@ -1,16 +1,57 @@
+import asyncio
 import httpx
+import ipaddress
 import logging
-import socket
+import time
+from functools import lru_cache
 from typing import Optional, List
 
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=1024)
+def _is_valid_ip(ip: str) -> bool:
+    """
+    Check if a string is a valid IPv4 or IPv6 address, memoized since the
+    same few addresses are checked over and over.
+    
+    Args:
+        ip: String to check
+        
+    Returns:
+        True if valid IP address, False otherwise
+    """
+    try:
+        ipaddress.ip_address(ip)
+        return True
+    except ValueError:
+        return False
+
+
+@lru_cache(maxsize=1024)
+def _normalize_ip(ip: str) -> str:
+    """
+    Get the canonical text form of an IP address, memoized like _is_valid_ip.
+    
+    Args:
+        ip: IP address to normalize
+        
+    Returns:
+        Compressed lowercase form of the address, or ip unchanged if it is not
+        a valid IP address
+    """
+    try:
+        return ipaddress.ip_address(ip).compressed
+    except ValueError:
+        return ip
+
+
 class IPService:
     """
     Service for retrieving and managing IP addresses.
     """
     
-    # IP services in order of preference
+    # IP services queried concurrently, the first valid answer wins
     IP_SERVICES = [
         "https://api.ipify.org",
         "https://ifconfig.me/ip",
@@ -18,28 +59,118 @@ class IPService:
         "https://ip.42.pl/raw"
     ]
     
+    # Number of seconds a retrieved IP is reused before querying the services again
+    CACHE_TTL = 30.0
+    
+    _cached_ip: Optional[str] = None
+    _cached_at: float = 0.0
+    
+    # Lookup currently in progress, awaited by every concurrent caller
+    _pending_lookup: Optional["asyncio.Future[Optional[str]]"] = None
+    
     @staticmethod
-    async def get_current_ip() -> Optional[str]:
+    async def get_current_ip(force_refresh: bool = False) -> Optional[str]:
         """
         Get the current public IP address by querying multiple services.
         
+        The last retrieved IP is cached for CACHE_TTL seconds so that repeated
+        calls within that window don't hit the external services again, and
+        concurrent calls share a single lookup.
+        
+        Args:
+            force_refresh: Ignore the cached IP and query the services, for
+                explicitly requested updates
+        
+        Returns:
+            The current public IP address or None if retrieval fails
+        """
+        if (
+            not force_refresh
+            and IPService._cached_ip
+            and time.monotonic() - IPService._cached_at < IPService.CACHE_TTL
+        ):
+            return IPService._cached_ip
+        
+        if IPService._pending_lookup is None:
+            IPService._pending_lookup = asyncio.ensure_future(IPService._lookup_current_ip())
+            IPService._pending_lookup.add_done_callback(IPService._clear_pending_lookup)
+        
+        # Shield the shared lookup so a cancelled caller doesn't cancel it for the others
+        return await asyncio.shield(IPService._pending_lookup)
+    
+    @staticmethod
+    def _clear_pending_lookup(lookup: "asyncio.Future[Optional[str]]") -> None:
+        """
+        Forget a finished lookup so the next cache miss starts a new one.
+        
+        Args:
+            lookup: The finished lookup
+        """
+        if IPService._pending_lookup is lookup:
+            IPService._pending_lookup = None
+    
+    @staticmethod
+    async def _lookup_current_ip() -> Optional[str]:
+        """
+        Query all IP services at once and keep the answer of the first service
+        in IP_SERVICES order that returns a valid IP.
+        
+        The services are queried concurrently, but their priority is kept: the
+        first service (api.ipify.org) only returns IPv4 while the others may
+        return IPv6 on dual-stack hosts, so the address family must not depend
+        on which response arrives first. Lower priority requests are cancelled
+        as soon as a valid answer is retrieved.
+        
         Returns:
             The current public IP address or None if retrieval fails
         """
-        for service_url in IPService.IP_SERVICES:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            lookups = [
+                asyncio.ensure_future(IPService._fetch_ip(client, service_url))
+                for service_url in IPService.IP_SERVICES
+            ]
             try:
-                async with httpx.AsyncClient(timeout=5.0) as client:
-                    response = await client.get(service_url)
-                    if response.status_code == 200:
-                        ip = response.text.strip()
+                for lookup, service_url in zip(lookups, IPService.IP_SERVICES):
+                    ip = await lookup
+                    if ip:
                         logger.info(f"Retrieved current IP: {ip} from {service_url}")
+                        IPService._cached_ip = ip
+                        IPService._cached_at = time.monotonic()
                         return ip
-            except Exception as e:
-                logger.warning(f"Failed to get IP from {service_url}: {e}")
+            finally:
+                for lookup in lookups:
+                    lookup.cancel()
+                await asyncio.gather(*lookups, return_exceptions=True)
         
         logger.error("Failed to retrieve current IP from all services")
         return None
     
+    @staticmethod
+    async def _fetch_ip(client: httpx.AsyncClient, service_url: str) -> Optional[str]:
+        """
+        Ask a single IP service for the current IP.
+        
+        Args:
+            client: HTTP client to use
+            service_url: URL of the IP service
+            
+        Returns:
+            The IP returned by the service, or None if the request failed or
+            the answer is not a valid IP address
+        """
+        try:
+            response = await client.get(service_url)
+            if response.status_code == 200:
+                ip = response.text.strip()
+                if IPService.is_valid_ip(ip):
+                    # Canonical form, so plain string comparisons with the stored
+                    # record contents (in SQL too) are reliable
+                    return _normalize_ip(ip)
+                logger.warning(f"Invalid IP returned by {service_url}: {ip!r}")
+        except Exception as e:
+            logger.warning(f"Failed to get IP from {service_url}: {e}")
+        return None
+    
     @staticmethod
     def is_valid_ip(ip: str) -> bool:
         """
@@ -51,17 +182,20 @@ class IPService:
         Returns:
             True if valid IP address, False otherwise
         """
-        try:
-            # Try parsing as IPv4
-            socket.inet_pton(socket.AF_INET, ip)
-            return True
-        except socket.error:
-            try:
-                # Try parsing as IPv6
-                socket.inet_pton(socket.AF_INET6, ip)
-                return True
-            except socket.error:
-                return False
+        return _is_valid_ip(ip)
+    
+    @staticmethod
+    def normalize_ip(ip: str) -> str:
+        """
+        Get the canonical text form of an IP address.
+        
+        Args:
+            ip: IP address to normalize
+            
+        Returns:
+            Normalized IP address, or ip unchanged if it is not a valid IP address
+        """
+        return _normalize_ip(ip)
     
     @staticmethod
     def is_ip_changed(new_ip: str, old_ip: str) -> bool:
@@ -78,4 +212,4 @@ class IPService:
         if not old_ip:
             return True
             
-        return new_ip != old_ip 
\ No newline at end of file
+        return new_ip != old_ip and _normalize_ip(new_ip) != _normalize_ip(old_ip) 
\ No newline at end of file
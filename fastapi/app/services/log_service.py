@@ -1,8 +1,41 @@
-from typing import Optional
+import asyncio
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Row, Select, insert, select
 from sqlalchemy.orm import Session
+from ..core.database import SessionLocal
 from ..models.log import Log, LogLevel
 
 
+logger = logging.getLogger(__name__)
+
+# Logs queued by write_log are inserted in batches of up to LOG_BATCH_SIZE
+# rows, at most LOG_FLUSH_INTERVAL seconds after the first one was queued
+LOG_BATCH_SIZE = 100
+LOG_FLUSH_INTERVAL = 0.5
+
+# Rows fetched per round trip when streaming logs
+LOG_STREAM_BATCH_SIZE = 500
+
+# Columns returned when streaming logs, so rows skip ORM object construction
+LOG_STREAM_COLUMNS = (
+    Log.id,
+    Log.level,
+    Log.message,
+    Log.details,
+    Log.ip_address,
+    Log.created_at,
+    Log.user_id,
+    Log.dns_record_id,
+)
+
+_log_queue: Optional[asyncio.Queue] = None
+_log_writer_loop: Optional[asyncio.AbstractEventLoop] = None
+_log_writer_task: Optional[asyncio.Task] = None
+
+
 class LogService:
     """
     Service for creating and managing system logs.
@@ -16,7 +49,8 @@ class LogService:
         user_id: Optional[int] = None,
         details: Optional[str] = None,
         ip_address: Optional[str] = None,
-        dns_record_id: Optional[int] = None
+        dns_record_id: Optional[int] = None,
+        commit: bool = True
     ) -> Log:
         """
         Create a new log entry.
@@ -29,6 +63,8 @@ class LogService:
             details: Optional additional details
             ip_address: Optional IP address
             dns_record_id: Optional DNS record ID
+            commit: Whether to commit immediately, or leave the log to be
+                written by the caller's commit along with its other changes
             
         Returns:
             Created log object
@@ -43,33 +79,315 @@ class LogService:
         )
         
         db.add(log)
-        db.commit()
-        db.refresh(log)
+        if commit:
+            db.commit()
         
         return log
     
+    @staticmethod
+    def write_log(
+        level: LogLevel,
+        message: str,
+        user_id: Optional[int] = None,
+        details: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        dns_record_id: Optional[int] = None
+    ) -> None:
+        """
+        Create a new log entry outside of the caller's database session.
+        
+        While the log writer is running the entry is queued and inserted with
+        the next batch, otherwise it is written right away with a dedicated
+        session. Safe to call from the event loop or from a worker thread.
+        
+        Args:
+            level: Log level (INFO, WARNING, ERROR, SUCCESS)
+            message: Log message
+            user_id: Optional user ID related to this log
+            details: Optional additional details
+            ip_address: Optional IP address
+            dns_record_id: Optional DNS record ID
+        """
+        entry = {
+            "level": level,
+            "message": message,
+            "user_id": user_id,
+            "details": details,
+            "ip_address": ip_address,
+            "dns_record_id": dns_record_id
+        }
+        
+        if not _enqueue_log(entry):
+            _insert_logs([entry])
+    
+    @staticmethod
+    def create_logs(db: Session, entries: List[Dict[str, Any]]) -> None:
+        """
+        Create several log entries with a single bulk insert.
+        
+        Pending changes in the session are committed along with the logs.
+        
+        Args:
+            db: Database session
+            entries: Log fields (level, message, user_id, ...) for each entry
+        """
+        if entries:
+            db.execute(insert(Log), entries)
+        db.commit()
+    
     @staticmethod
     def get_logs(
         db: Session,
         skip: int = 0,
         limit: int = 100,
-        user_id: Optional[int] = None
+        user_id: Optional[int] = None,
+        before_id: Optional[int] = None
     ) -> list[Log]:
         """
-        Get paginated logs, optionally filtered by user.
+        Get paginated logs, newest first, optionally filtered by user.
         
         Args:
             db: Database session
             skip: Number of records to skip
             limit: Maximum number of records to return
             user_id: Optional user ID to filter logs
+            before_id: Only return logs older than this log ID (keyset pagination)
             
         Returns:
             List of log objects
         """
-        query = db.query(Log)
+        stmt = select(Log)
+        
+        if user_id is not None:
+            stmt = stmt.where(Log.user_id == user_id)
+        
+        return LogService._paginate(db, stmt, skip, limit, before_id)
+    
+    @staticmethod
+    def get_system_logs(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        before_id: Optional[int] = None
+    ) -> list[Log]:
+        """
+        Get paginated system logs (logs not associated with a user), newest first.
+        
+        Args:
+            db: Database session
+            skip: Number of records to skip
+            limit: Maximum number of records to return
+            before_id: Only return logs older than this log ID (keyset pagination)
+            
+        Returns:
+            List of log objects
+        """
+        stmt = select(Log).where(Log.user_id.is_(None))
+        return LogService._paginate(db, stmt, skip, limit, before_id)
+    
+    @staticmethod
+    def stream_logs(
+        db: Session,
+        user_id: Optional[int] = None,
+        before_id: Optional[int] = None
+    ) -> Iterator[Row]:
+        """
+        Iterate over all logs, newest first, optionally filtered by user.
+        
+        Rows are fetched LOG_STREAM_BATCH_SIZE at a time, so memory stays
+        bounded however many logs there are.
+        
+        Args:
+            db: Database session
+            user_id: Optional user ID to filter logs
+            before_id: Only return logs older than this log ID
+            
+        Returns:
+            Iterator of log rows with the LOG_STREAM_COLUMNS fields
+        """
+        stmt = select(*LOG_STREAM_COLUMNS)
         
         if user_id is not None:
-            query = query.filter(Log.user_id == user_id)
+            stmt = stmt.where(Log.user_id == user_id)
         
-        return query.order_by(Log.created_at.desc()).offset(skip).limit(limit).all() 
\ No newline at end of file
+        return LogService._stream(db, stmt, before_id)
+    
+    @staticmethod
+    def stream_system_logs(
+        db: Session,
+        before_id: Optional[int] = None
+    ) -> Iterator[Row]:
+        """
+        Iterate over all system logs, newest first.
+        
+        Args:
+            db: Database session
+            before_id: Only return logs older than this log ID
+            
+        Returns:
+            Iterator of log rows with the LOG_STREAM_COLUMNS fields
+        """
+        stmt = select(*LOG_STREAM_COLUMNS).where(Log.user_id.is_(None))
+        return LogService._stream(db, stmt, before_id)
+    
+    @staticmethod
+    def _stream(db: Session, stmt: Select, before_id: Optional[int]) -> Iterator[Row]:
+        """
+        Order a log query newest first and execute it in batches.
+        
+        Args:
+            db: Database session
+            stmt: Log query to stream
+            before_id: Only return logs older than this log ID
+            
+        Returns:
+            Iterator of result rows
+        """
+        if before_id is not None:
+            stmt = stmt.where(Log.id < before_id)
+        
+        stmt = stmt.order_by(Log.id.desc()).execution_options(yield_per=LOG_STREAM_BATCH_SIZE)
+        return iter(db.execute(stmt))
+    
+    @staticmethod
+    def _paginate(
+        db: Session,
+        stmt: Select,
+        skip: int,
+        limit: int,
+        before_id: Optional[int]
+    ) -> list[Log]:
+        """
+        Order a log query newest first and apply pagination.
+        
+        Log IDs increase with insertion time, so ordering by ID matches
+        created_at order and lets before_id seek directly through the
+        (user_id, id) index instead of scanning and discarding skipped rows.
+        
+        Args:
+            db: Database session
+            stmt: Log query to paginate
+            skip: Number of records to skip, ignored when before_id is given
+            limit: Maximum number of records to return
+            before_id: Only return logs older than this log ID
+            
+        Returns:
+            List of log objects
+        """
+        if before_id is not None:
+            stmt = stmt.where(Log.id < before_id)
+        else:
+            stmt = stmt.offset(skip)
+        
+        stmt = stmt.order_by(Log.id.desc()).limit(limit)
+        return list(db.execute(stmt).scalars().all())
+
+
+def _enqueue_log(entry: Dict[str, Any]) -> bool:
+    """
+    Queue a log entry for the background log writer.
+    
+    Args:
+        entry: Log fields to insert
+        
+    Returns:
+        True if the entry was queued, False if the writer isn't running
+    """
+    loop = _log_writer_loop
+    if loop is None or _log_writer_task is None or _log_writer_task.done():
+        return False
+    
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    
+    if running_loop is loop:
+        _log_queue.put_nowait(entry)
+    else:
+        # asyncio.Queue isn't thread-safe, so hand the entry to the writer's loop
+        loop.call_soon_threadsafe(_log_queue.put_nowait, entry)
+    return True
+
+
+def _insert_logs(entries: List[Dict[str, Any]]) -> None:
+    """
+    Insert log entries in one statement and commit, with a dedicated session.
+    
+    Args:
+        entries: Log fields for each entry
+    """
+    db = SessionLocal()
+    try:
+        db.execute(insert(Log), entries)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _run_log_writer() -> None:
+    """
+    Consume the log queue, inserting entries in batches until stopped.
+    
+    A None entry in the queue stops the writer once pending entries are written.
+    """
+    loop = asyncio.get_running_loop()
+    stopping = False
+    
+    while not stopping:
+        entry = await _log_queue.get()
+        if entry is None:
+            break
+        
+        batch = [entry]
+        deadline = loop.time() + LOG_FLUSH_INTERVAL
+        while len(batch) < LOG_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                entry = await asyncio.wait_for(_log_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if entry is None:
+                stopping = True
+                break
+            batch.append(entry)
+        
+        try:
+            await run_in_threadpool(_insert_logs, batch)
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} queued logs: {e}")
+
+
+def start_log_writer() -> None:
+    """
+    Start the background task writing logs queued by LogService.write_log.
+    
+    Must be called from the application's event loop.
+    """
+    global _log_queue, _log_writer_loop, _log_writer_task
+    
+    if _log_writer_task is not None and not _log_writer_task.done():
+        return
+    
+    _log_queue = asyncio.Queue()
+    _log_writer_loop = asyncio.get_running_loop()
+    _log_writer_task = _log_writer_loop.create_task(_run_log_writer())
+
+
+async def stop_log_writer() -> None:
+    """
+    Write the logs still queued and stop the background log writer.
+    """
+    global _log_writer_loop, _log_writer_task
+    
+    if _log_writer_task is None:
+        return
+    
+    if not _log_writer_task.done():
+        _log_queue.put_nowait(None)
+        await _log_writer_task
+    
+    _log_writer_loop = None
+    _log_writer_task = None
@@ -1,18 +1,24 @@
 import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import Optional, List
+from itertools import groupby
+from operator import attrgetter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, List, Tuple
 
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
-from sqlalchemy.orm import Session
-from ..core.database import SessionLocal
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
+from ..core.config import settings
+from ..core.database import SessionLocal, engine
 from ..models.dns_record import DNSRecord
 from ..models.user import User
 from ..models.log import LogLevel
-from .cloudflare import CloudflareService
+from .cloudflare import CloudflareService, get_cf_service
 from .ip_service import IPService
 from .log_service import LogService
 from ..repositories.dns_record_repo import DnsRecordRepo
@@ -20,57 +26,65 @@ from ..repositories.dns_record_repo import DnsRecordRepo
 
 logger = logging.getLogger(__name__)
 
+# One run at a time per job, and missed runs younger than 5 minutes are merged
+# into a single one
+JOB_OPTIONS = {
+    "max_instances": 1,
+    "coalesce": True,
+    "misfire_grace_time": 300,
+}
+
+# Record types whose content is the public IP, kept in sync by the jobs
+_AUTO_TYPES = frozenset({"A", "AAAA"})
+
+UPDATE_INTERVAL_MINUTES = 10
+
+
+def _create_scheduler() -> AsyncIOScheduler:
+    """
+    Create the APScheduler instance, storing its jobs in the application
+    database so their schedule survives restarts.
+    
+    Returns:
+        Scheduler using a SQLAlchemy job store on the application engine
+    """
+    return AsyncIOScheduler(jobstores={"default": SQLAlchemyJobStore(engine=engine)})
+
 
 class DnsUpdateScheduler:
     """
-    Singleton scheduler for performing automated DNS updates.
+    Scheduler for performing automated DNS updates.
     
     This class manages scheduled tasks for checking and updating DNS records 
     with auto_update enabled. It runs as a background service to ensure 
     DNS records are kept in sync with the current public IP address.
     """
     
-    _instance = None
-    
-    def __new__(cls):
-        """
-        Create a new instance of DnsUpdateScheduler or return the existing one.
-        
-        Returns:
-            The singleton instance of DnsUpdateScheduler
-        """
-        if cls._instance is None:
-            cls._instance = super(DnsUpdateScheduler, cls).__new__(cls)
-            cls._instance.scheduler = AsyncIOScheduler()
-            cls._instance._initialized = False
-        return cls._instance
-    
     def __init__(self):
         """
-        Initialize the scheduler instance if it hasn't been initialized yet.
+        Initialize the scheduler instance.
         
-        This method is called after __new__ and sets up the scheduler instance 
-        with proper configuration.
+        The application uses the module-level dns_scheduler instance, which the
+        persisted jobs refer to.
         """
-        if not hasattr(self, 'scheduler'):
-            self.scheduler = AsyncIOScheduler()
-            self._initialized = False
+        self.scheduler = _create_scheduler()
+        self._initialized = False
+        # Time and IP of the last run that left every record up to date
+        self._last_clean_run: Optional[Tuple[datetime, str]] = None
     
-    @classmethod
-    def initialize(cls):
+    @staticmethod
+    def initialize():
         """
-        Initialize the scheduler singleton instance and start it.
+        Start the module-level scheduler instance.
         
         This is a convenience method for explicitly initializing the scheduler
-        from external code. It creates the instance if needed and starts the
-        scheduler.
+        from external code.
         
         Returns:
-            The initialized scheduler instance
+            The started dns_scheduler instance
         """
-        instance = cls()
-        instance.start()
-        return instance
+        dns_scheduler.start()
+        return dns_scheduler
     
     def start(self):
         """
@@ -87,23 +101,31 @@ class DnsUpdateScheduler:
         if not self.scheduler.running:
             logger.info("Starting DNS update scheduler")
             
-            # Add job to update DNS records every 10 minutes
-            self.scheduler.add_job(
-                self.update_dns_records,
-                IntervalTrigger(minutes=10),
-                id="update_dns_records_job",
-                replace_existing=True
-            )
+            # The job store is started before looking up the persisted jobs
+            self.scheduler.start()
             
-            # Add job to check all DNS records daily at 3 AM
-            self.scheduler.add_job(
-                self.check_all_dns_records,
-                CronTrigger(hour=3, minute=0),
-                id="check_all_dns_records_job",
-                replace_existing=True
-            )
+            # Jobs are stored in the database and referenced by path, so they are
+            # only added when missing to keep the persisted next run times
+            if self.scheduler.get_job("update_dns_records_job") is None:
+                # Add job to update DNS records every 10 minutes
+                self.scheduler.add_job(
+                    f"{__name__}:dns_scheduler.update_dns_records",
+                    IntervalTrigger(minutes=UPDATE_INTERVAL_MINUTES),
+                    id="update_dns_records_job",
+                    replace_existing=True,
+                    **JOB_OPTIONS
+                )
+            
+            if self.scheduler.get_job("check_all_dns_records_job") is None:
+                # Add job to check all DNS records daily at 3 AM
+                self.scheduler.add_job(
+                    f"{__name__}:dns_scheduler.check_all_dns_records",
+                    CronTrigger(hour=3, minute=0),
+                    id="check_all_dns_records_job",
+                    replace_existing=True,
+                    **JOB_OPTIONS
+                )
             
-            self.scheduler.start()
             self._initialized = True
             logger.info("DNS update scheduler started successfully")
         else:
@@ -127,7 +149,6 @@ class DnsUpdateScheduler:
         """
         logger.info("Running scheduled DNS record update for auto-updated records")
         
-        db = SessionLocal()
         try:
             # Get current IP
             current_ip = await IPService.get_current_ip()
@@ -137,33 +158,37 @@ class DnsUpdateScheduler:
                 
             logger.info(f"Current IP for DNS updates: {current_ip}")
             
-            # Get all DNS records with auto_update enabled
-            records = db.query(DNSRecord).filter(
-                DNSRecord.auto_update == True,
-                DNSRecord.record_type.in_(["A", "AAAA"])
-            ).all()
+            # Get the DNS records with auto_update enabled and an outdated IP, ordered by user
+            # The blocking query runs in a thread so it doesn't stall the event loop
+            records = await run_in_threadpool(
+                self._load_records,
+                lambda db: DnsRecordRepo.get_all_auto_update(
+                    db, record_types=_AUTO_TYPES, outdated_for_ip=current_ip
+                )
+            )
             
             if not records:
-                logger.info("No DNS records with auto_update enabled found")
+                logger.info("No auto-updated DNS records need an IP change")
+                self._last_clean_run = (datetime.now(timezone.utc), current_ip)
                 return
                 
-            logger.info(f"Found {len(records)} records with auto_update enabled")
+            logger.info(f"Found {len(records)} auto-updated records with an outdated IP")
+            
+            pending = self._pair_with_user_services(records)
+            
+            updated_records, log_entries = await self._update_record_ips(pending, current_ip)
             
-            # Update each record if needed
-            updated_count = 0
-            for record in records:
-                if IPService.is_ip_changed(current_ip, record.content):
-                    await self._update_record_ip(db, record, current_ip)
-                    updated_count += 1
-                else:
-                    logger.debug(f"No IP change needed for {record.record_name}")
+            # Save every confirmed update and its logs in a single transaction
+            await run_in_threadpool(
+                self._save_updated_records, updated_records, current_ip, log_entries
+            )
+            if len(updated_records) == len(records):
+                self._last_clean_run = (datetime.now(timezone.utc), current_ip)
                     
-            logger.info(f"Scheduled DNS update completed. Updated {updated_count} records.")
+            logger.info(f"Scheduled DNS update completed. Updated {len(updated_records)} records.")
             
         except Exception as e:
             logger.error(f"Error in scheduled DNS update: {e}", exc_info=True)
-        finally:
-            db.close()
     
     async def check_all_dns_records(self):
         """
@@ -173,63 +198,215 @@ class DnsUpdateScheduler:
         """
         logger.info("Running daily check of all DNS records")
         
-        db = SessionLocal()
         try:
-            # Get current IP
-            current_ip = await IPService.get_current_ip()
+            # Get current IP, the daily check doesn't trust a cached one
+            current_ip = await IPService.get_current_ip(force_refresh=True)
             if not current_ip:
                 logger.error("Failed to retrieve current IP for daily check")
                 return
+            
+            if self._has_recent_clean_run(current_ip):
+                logger.info("Auto-update job recently left every record up to date, skipping daily check")
+                return
                 
-            # Get all DNS records
-            records = db.query(DNSRecord).filter(
-                DNSRecord.record_type.in_(["A", "AAAA"])
-            ).all()
+            # Get the auto-update DNS records that don't point at the current IP
+            stmt = (
+                select(DNSRecord)
+                .options(joinedload(DNSRecord.user))
+                .where(
+                    DNSRecord.auto_update.is_(True),
+                    DNSRecord.record_type.in_(_AUTO_TYPES),
+                    DNSRecord.content != current_ip
+                )
+                .order_by(DNSRecord.user_id, DNSRecord.id)
+            )
+            records = await run_in_threadpool(
+                self._load_records, lambda db: db.execute(stmt).scalars().all()
+            )
+            
+            logger.info(f"Found {len(records)} DNS records with an outdated IP")
+            
+            pending = self._pair_with_user_services(records)
             
-            logger.info(f"Checking {len(records)} DNS records")
+            updated_records, log_entries = await self._update_record_ips(pending, current_ip)
             
-            # Check each auto-update record to ensure it has the correct IP
-            updated_count = 0
-            for record in records:
-                if record.auto_update and IPService.is_ip_changed(current_ip, record.content):
-                    logger.info(f"Record {record.record_name} has outdated IP, updating")
-                    await self._update_record_ip(db, record, current_ip)
-                    updated_count += 1
+            await run_in_threadpool(
+                self._save_updated_records, updated_records, current_ip, log_entries
+            )
             
-            logger.info(f"Daily DNS record check completed. Updated {updated_count} records.")
+            logger.info(f"Daily DNS record check completed. Updated {len(updated_records)} records.")
             
         except Exception as e:
             logger.error(f"Error in daily DNS check: {e}", exc_info=True)
-        finally:
-            db.close()
     
-    async def _update_record_ip(self, db: Session, record: DNSRecord, new_ip: str):
+    @staticmethod
+    def _load_records(query: Callable[[Session], List[DNSRecord]]) -> List[DNSRecord]:
+        """
+        Load DNS records in a short-lived session.
+        
+        The session is closed before the Cloudflare calls so no pooled
+        connection sits idle during them. The returned records are detached
+        and only their loaded attributes (including the user) can be used.
+        
+        Args:
+            query: Function loading the records from a session
+            
+        Returns:
+            Detached DNS records
+        """
+        with SessionLocal() as db:
+            return query(db)
+    
+    def _has_recent_clean_run(self, current_ip: str) -> bool:
+        """
+        Check whether the auto-update job recently brought every record to the
+        given IP, in which case the daily check has nothing left to fix.
+        
+        Args:
+            current_ip: The freshly retrieved public IP
+            
+        Returns:
+            True if the last clean run used this IP within two update intervals
+        """
+        if self._last_clean_run is None:
+            return False
+        finished_at, ip = self._last_clean_run
+        window = timedelta(minutes=2 * UPDATE_INTERVAL_MINUTES)
+        return ip == current_ip and datetime.now(timezone.utc) - finished_at < window
+    
+    @staticmethod
+    def _get_cf_service(user: Optional[User]) -> Optional[CloudflareService]:
         """
-        Update a DNS record's IP address in database and Cloudflare.
+        Get the cached Cloudflare service for a user's API credentials.
+        
+        Args:
+            user: The user owning the records, or None if missing
+            
+        Returns:
+            CloudflareService instance, or None if the user is missing
+        """
+        if not user:
+            return None
+        return get_cf_service(
+            user.id,
+            user.cloudflare_api_key,
+            user.cloudflare_email,
+            is_token=user.is_token
+        )
+    
+    @classmethod
+    def _pair_with_user_services(
+        cls,
+        records: List[DNSRecord]
+    ) -> List[Tuple[DNSRecord, Optional[CloudflareService]]]:
+        """
+        Pair each record with the Cloudflare service of its owner.
+        
+        Records are expected ordered by user_id with their user loaded, so the
+        service is resolved once per user and shared by all of their records.
+        
+        Args:
+            records: DNS records ordered by user_id
+            
+        Returns:
+            Each record with its owner's Cloudflare service (None if missing)
+        """
+        pending = []
+        for user_id, user_records in groupby(records, key=attrgetter("user_id")):
+            user_records = list(user_records)
+            cf_service = cls._get_cf_service(user_records[0].user)
+            pending.extend((record, cf_service) for record in user_records)
+        return pending
+    
+    async def _update_record_ips(
+        self,
+        pending: List[Tuple[DNSRecord, Optional[CloudflareService]]],
+        new_ip: str
+    ) -> Tuple[List[DNSRecord], List[Dict[str, Any]]]:
+        """
+        Update the IP address of several DNS records in Cloudflare concurrently.
+        
+        At most CLOUDFLARE_MAX_CONCURRENCY updates are in flight at once.
+        
+        Args:
+            pending: Records to update, each with the Cloudflare service of its
+                owner (None if the owner is missing)
+            new_ip: The new IP address to set
+            
+        Returns:
+            Records Cloudflare accepted the new IP for, and the log entries of
+            every attempt
+        """
+        semaphore = asyncio.Semaphore(settings.CLOUDFLARE_MAX_CONCURRENCY)
+        
+        async def update(record: DNSRecord, cf_service: Optional[CloudflareService]):
+            async with semaphore:
+                return await self._update_record_ip(record, new_ip, cf_service)
+        
+        results = await asyncio.gather(
+            *(update(record, cf_service) for record, cf_service in pending),
+            return_exceptions=True
+        )
+        
+        updated_records = []
+        log_entries = []
+        for (record, _), result in zip(pending, results):
+            # An unexpected error must not discard the other updates
+            if isinstance(result, Exception):
+                logger.error(f"Unexpected error updating DNS record ID {record.id}: {result}")
+                log_entries.append({
+                    "user_id": record.user_id,
+                    "dns_record_id": record.id,
+                    "ip_address": new_ip,
+                    "level": LogLevel.ERROR,
+                    "message": (
+                        f"Erreur lors de la mise à jour d'IP pour {record.record_name}: {str(result)}"
+                    ),
+                })
+                continue
+            # Cancellation is propagated rather than treated as a failed update
+            if isinstance(result, BaseException):
+                raise result
+            success, log_entry = result
+            if success:
+                updated_records.append(record)
+            log_entries.append(log_entry)
+        return updated_records, log_entries
+    
+    async def _update_record_ip(
+        self,
+        record: DNSRecord,
+        new_ip: str,
+        cf_service: Optional[CloudflareService]
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Update a DNS record's IP address in Cloudflare.
+        
+        Nothing is written to the database, so that callers can save every
+        update and its log at once with _save_updated_records.
         
         Args:
-            db: Database session
             record: The DNS record to update
             new_ip: The new IP address to set
+            cf_service: Cloudflare service of the record owner, None if the
+                owner is missing
+            
+        Returns:
+            Whether Cloudflare accepted the update, and the log entry to write
         """
         logger.info(f"Updating DNS record {record.record_name} IP from {record.content} to {new_ip}")
         
+        log_entry = {
+            "user_id": record.user_id,
+            "dns_record_id": record.id,
+            "ip_address": new_ip,
+        }
+        
         try:
-            # Get user for API credentials
-            user = db.query(User).filter(User.id == record.user_id).first()
-            if not user:
-                logger.error(f"User not found for record ID {record.id}")
-                return
-            
-            # Initialize Cloudflare service
-            cf_service = CloudflareService(
-                user.cloudflare_api_key, 
-                user.cloudflare_email,
-                is_token=user.is_token
-            )
+            if cf_service is None:
+                raise ValueError(f"User not found for record ID {record.id}")
             
             # Update record in Cloudflare
-            old_ip = record.content
             success = await cf_service.update_dns_record(
                 zone_id=record.zone_id,
                 record_id=record.record_id,
@@ -242,48 +419,49 @@ class DnsUpdateScheduler:
             
             if not success:
                 logger.error(f"Failed to update DNS record {record.record_name} in Cloudflare")
-                
-                # Log error
-                LogService.create_log(
-                    db=db,
-                    level=LogLevel.ERROR,
-                    message=f"Échec de mise à jour automatique d'IP pour {record.record_name}",
-                    user_id=record.user_id,
-                    record_id=record.id,
-                    ip_address=new_ip
-                )
-                return
-            
-            # Update record in database
-            record.content = new_ip
-            record.last_updated = datetime.utcnow()
-            db.commit()
-            
-            # Log success
-            LogService.create_log(
-                db=db,
-                level=LogLevel.INFO,
-                message=f"Mise à jour automatique d'IP pour {record.record_name} de {old_ip} à {new_ip}",
-                user_id=record.user_id,
-                record_id=record.id,
-                ip_address=new_ip
-            )
+                log_entry["level"] = LogLevel.ERROR
+                log_entry["message"] = f"Échec de mise à jour automatique d'IP pour {record.record_name}"
+                return False, log_entry
             
             logger.info(f"Successfully updated DNS record {record.record_name}")
+            log_entry["level"] = LogLevel.INFO
+            log_entry["message"] = (
+                f"Mise à jour automatique d'IP pour {record.record_name} de {record.content} à {new_ip}"
+            )
+            return True, log_entry
             
         except Exception as e:
             logger.error(f"Error updating DNS record {record.record_name}: {e}", exc_info=True)
-            
-            # Log error
-            LogService.create_log(
-                db=db,
-                level=LogLevel.ERROR,
-                message=f"Erreur lors de la mise à jour d'IP pour {record.record_name}: {str(e)}",
-                user_id=record.user_id,
-                record_id=record.id,
-                ip_address=new_ip
-            )
+            log_entry["level"] = LogLevel.ERROR
+            log_entry["message"] = f"Erreur lors de la mise à jour d'IP pour {record.record_name}: {str(e)}"
+            return False, log_entry
+    
+    @staticmethod
+    def _save_updated_records(
+        records: List[DNSRecord],
+        new_ip: str,
+        log_entries: List[Dict[str, Any]]
+    ):
+        """
+        Save the new IP of records updated in Cloudflare along with the logs
+        of the run, in a single transaction of a short-lived session.
+        
+        Args:
+            records: DNS records Cloudflare accepted the new IP for
+            new_ip: The new IP address
+            log_entries: Log fields for each update attempt
+        """
+        if not records and not log_entries:
+            return
+        
+        # Closing the session rolls back whatever wasn't committed on error
+        with SessionLocal() as db:
+            if records:
+                DnsRecordRepo.bulk_set_ip(
+                    db, new_ip, record_ids=[record.id for record in records], commit=False
+                )
+            LogService.create_logs(db=db, entries=log_entries)
 
 
-# Singleton instance
+# Shared instance, used by the application and referenced by the persisted jobs
 dns_scheduler = DnsUpdateScheduler() 
\ No newline at end of file
@@ -2,6 +2,7 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
 from ..db.session import get_db
@@ -17,6 +18,10 @@ reusable_oauth2 = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/log
 class UserService:
     """
     Service for user operations.
+    
+    Methods are synchronous: they hash or verify passwords with bcrypt and use a
+    sync database session, so async callers must run them in the threadpool
+    (see app/api/endpoints/auth.py) rather than on the event loop.
     """
     
     @staticmethod
@@ -73,13 +78,18 @@ class UserService:
         Returns:
             Created user object
         """
-        # Check if username or email already exists
-        if cls.get_by_username(db, user_in.username):
+        # Check if username or email already exists, in a single query
+        # (the username and email may belong to two different users, so the
+        # username match takes precedence whatever the row order)
+        existing_users = db.query(User.username, User.email).filter(
+            or_(User.username == user_in.username, User.email == user_in.email)
+        ).all()
+        if any(username == user_in.username for username, _ in existing_users):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username already registered",
             )
-        if cls.get_by_email(db, user_in.email):
+        if existing_users:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered",
@@ -101,8 +111,9 @@ class UserService:
         db.commit()
         db.refresh(user)
         
-        # If this is the first user, mark setup as complete
-        if db.query(User).count() == 1:
+        # If this is the first user, mark setup as complete (once setup is
+        # done, later registrations skip the check)
+        if settings.FIRST_TIME_SETUP and db.query(User.id).limit(2).count() == 1:
             settings.FIRST_TIME_SETUP = False
             
         return user